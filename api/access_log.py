@@ -0,0 +1,137 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import orjson
+from django.conf import settings
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+ACCESS_LOG_DROPPED = Counter(
+    "nsgates_access_log_dropped_total",
+    "Registros de acesso descartados porque a fila do writer estava cheia",
+)
+ACCESS_LOG_WRITE_ERRORS = Counter(
+    "nsgates_access_log_write_errors_total",
+    "Registros de acesso perdidos por erro de gravação (ex: disco cheio, permissão)",
+)
+
+_STOP = object()
+
+
+class AccessLogWriter:
+    """
+    Log de acesso fora do caminho da requisição: o event loop só enfileira um dict (`put_nowait`)
+    e uma thread em segundo plano serializa com orjson e grava em lote no arquivo do dia (JSON Lines).
+    Fila cheia descarta o registro (contado em `nsgates_access_log_dropped_total`) em vez de bloquear.
+    Na virada do dia, arquivos com mais de `retention_days` dias são apagados.
+    Erros de gravação perdem só o lote (logados e contados); a thread continua rodando.
+    """
+
+    def __init__(self, log_dir: str, queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, sample_rate: float = 1.0, retention_days: int = 7):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.retention_days = retention_days
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._file = None
+        self._file_date = None
+
+    def log(self, record: dict):
+        """Enfileira um registro. Respostas de sucesso (< 400) respeitam `sample_rate`; erros sempre entram"""
+        if record.get("status_code", 500) < 400 and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            ACCESS_LOG_DROPPED.inc()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Grava o que ainda estiver na fila e encerra a thread"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                record = None
+
+            if record is _STOP:
+                self._flush(batch)
+                self._close()
+                return
+            if record is not None:
+                batch.append(record)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch: list):
+        try:
+            self._write(batch)
+        except OSError:
+            ACCESS_LOG_WRITE_ERRORS.inc(len(batch))
+            logger.exception(f"🚨 Falha ao gravar {len(batch)} registros do log de acesso")
+            self._close()  # 🔥 Reabre o arquivo no próximo lote
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        today = datetime.now().strftime("%Y-%m-%d")
+        if today != self._file_date:  # 🔥 Um arquivo por dia, como o log da API
+            self._close()
+            self._prune()
+            self._file = open(os.path.join(self.log_dir, f"access-{today}.log"), "ab")
+            self._file_date = today
+        self._file.write(b"".join(orjson.dumps(record) + b"\n" for record in batch))
+        self._file.flush()
+
+    def _prune(self):
+        """Apaga os arquivos do dia mais antigos que `retention_days` (outros workers podem apagar junto)"""
+        oldest = (date.today() - timedelta(days=self.retention_days)).isoformat()
+        for name in os.listdir(self.log_dir):
+            if name.startswith("access-") and name.endswith(".log") and name[len("access-"):-len(".log")] < oldest:
+                try:
+                    os.remove(os.path.join(self.log_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_date = None
+
+
+access_log = AccessLogWriter(
+    log_dir=settings.ACCESS_LOG_DIR,
+    queue_size=settings.ACCESS_LOG_QUEUE_SIZE,
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL,
+    sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+    retention_days=settings.ACCESS_LOG_RETENTION_DAYS,
+)
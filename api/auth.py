@@ -1,16 +1,34 @@
 import os
-import httpx
+import time
+import logging
 import environ
-from fastapi import Depends, HTTPException, Security
+import httpx
+from fastapi import Depends, HTTPException, Request, Security
 from fastapi.security.api_key import APIKeyHeader
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.status import HTTP_401_UNAUTHORIZED
-from django.utils.timezone import now
-from django.db.models import Q
-from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from core.db_executor import db_sync_to_async
 from core.models.apikey import APIKey
-from core.models.user import CustomUser  # 🔥 Agora buscamos direto do banco
-from django.contrib.auth.models import Permission
+from core.apikey_index import apikey_index
+from core.cache import hash_credential, rejected_credentials, rejections_by_source, token_cache
+from core.permissions import permission_codenames, permission_resolver
+from core import jwt_tokens
+from api import http_client
+from api.principal import Principal
+from api.singleflight import SingleFlight
+from api.timing import timed
+from oauth2_provider.models import AccessToken
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+AUTH_REJECTIONS = Counter(
+    "nsgates_auth_rejections_total",
+    "Credenciais recusadas por tipo; `source=cache` foi recusada pelo cache negativo, sem tocar no backend",
+    ["kind", "source"],
+)
 
 # 🔥 Carregar variáveis do .env
 env = environ.Env()
@@ -25,14 +43,45 @@ DJANGO_OAUTH2_VALIDATE_URL = os.getenv("DJANGO_OAUTH2_VALIDATE_URL", "http://127
 OAUTH2_CLIENT_ID = os.getenv("OAUTH2_CLIENT_ID")
 OAUTH2_CLIENT_SECRET = os.getenv("OAUTH2_CLIENT_SECRET")
 
+# 🔥 Agrupa buscas simultâneas pela mesma credencial (evita thundering herd quando o cache expira)
+token_flight = SingleFlight("token")
+permission_flight = SingleFlight("permissions")
+apikey_flight = SingleFlight("apikey")
+
+
+
+def record_rejection(request: Request, kind: str, cached: bool):
+    """Contabiliza a recusa nas métricas e por origem, alertando quando uma origem insiste"""
+    AUTH_REJECTIONS.labels(kind, "cache" if cached else "backend").inc()
+
+    source = request.client.host if request.client else "unknown"
+    count = rejections_by_source.get(source, 0) + 1
+    rejections_by_source.set(source, count)
+    if count == settings.NEGATIVE_CACHE_SOURCE_ALERT:
+        logger.warning(f"🚨 {count} credenciais inválidas vindas de {source} em {settings.NEGATIVE_CACHE_TTL}s")
+
+
+def check_rejected(request: Request, kind: str, credential_hash: str):
+    """Recusa na hora (sem Django nem Postgres) uma credencial recusada recentemente"""
+    rejected = rejected_credentials.get((kind, credential_hash))
+    if rejected is not None:
+        record_rejection(request, kind, cached=True)
+        raise HTTPException(status_code=rejected[0], detail=rejected[1])
+
+
+def remember_rejection(request: Request, kind: str, credential_hash: str, exc: HTTPException):
+    """Guarda a recusa no cache negativo pelo `NEGATIVE_CACHE_TTL`"""
+    rejected_credentials.set((kind, credential_hash), (exc.status_code, exc.detail))
+    record_rejection(request, kind, cached=False)
 
 
 def generate_permissions(model_name: str):
     """
     Gera automaticamente permissões padrão para um modelo.
-    Exemplo para `CustomUser` → `view_customuser`, `change_customuser`, `delete_customuser`
+    Exemplo para `CustomUser` → `add_customuser`, `view_customuser`, `change_customuser`, `delete_customuser`
     """
     return {
+        "add": f"add_{model_name.lower()}",
         "view": f"view_{model_name.lower()}",
         "change": f"change_{model_name.lower()}",
         "delete": f"delete_{model_name.lower()}",
@@ -40,81 +89,217 @@ def generate_permissions(model_name: str):
 
 
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
+async def resolve_permissions(username: str):
     """
-    Verifica se o token OAuth2 é válido no servidor Django e busca permissões diretamente do banco.
+    Retorna `(user_id, permissoes)` do usuário, com permissões diretas e de grupo em um `frozenset`.
+    No cache hit não há I/O; no miss, uma única query.
     """
-    token = credentials.credentials
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
+    entry = permission_resolver.cached(username)
+    if entry is None:
+        # 🔥 Executa de forma assíncrona, uma única query mesmo com várias requisições simultâneas
+        entry = await permission_flight.do(username, db_sync_to_async(permission_resolver.resolve), username)
+
+    if entry is None:
+        raise HTTPException(status_code=403, detail="Usuário não encontrado no banco")
+    return entry
+
+
+async def introspect_token_http(token: str) -> dict:
+    """
+    Valida o token chamando o endpoint de introspecção do Django OAuth2 via HTTP.
+    Só uma resposta `active: false` recusa o token (401); falhas do servidor de autenticação
+    (timeout, conexão, 5xx, resposta inesperada) viram 503/502 e não entram no cache negativo.
+    """
+    try:
+        response = await http_client.post(
             DJANGO_OAUTH2_VALIDATE_URL,
             data={"token": token, "client_id": OAUTH2_CLIENT_ID, "client_secret": OAUTH2_CLIENT_SECRET},
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
+    except httpx.HTTPError as exc:
+        logger.warning(f"🚨 Introspecção indisponível: {exc!r}")
+        raise HTTPException(status_code=503, detail="Servidor de autenticação indisponível")
+
+    try:
+        token_data = response.json() if response.status_code == 200 else None
+    except ValueError:
+        token_data = None
+    if not isinstance(token_data, dict) or "active" not in token_data:
+        logger.warning(f"🚨 Resposta inesperada da introspecção: HTTP {response.status_code}")
+        raise HTTPException(status_code=502, detail="Resposta inválida do servidor de autenticação")
+
+    if not token_data["active"]:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token inválido ou expirado")
 
-    token_data = response.json()
+    if not token_data.get("username"):
+        raise HTTPException(status_code=403, detail="Usuário não encontrado no token")
+
+    return token_data
 
-    # 🔍 Debugando a resposta do Django
-    # print(f"🔍 Token Data Recebido: {token_data}")
 
-    if response.status_code != 200 or not token_data.get("active"):
+async def introspect_token_db(token: str) -> dict:
+    """
+    Valida o token direto na tabela `AccessToken` do oauth2_provider, sem o loopback HTTP.
+    Token, usuário e permissões vêm em uma única query, que já alimenta o cache de permissões.
+    Retorna o mesmo formato da introspecção.
+    """
+    def get_access_token():
+        return (
+            AccessToken.objects.select_related("user", "application")
+            .filter(token_checksum=hash_credential(token))  # 🔥 Busca pelo índice único do checksum
+            .annotate(permission_codenames=permission_codenames("user"))
+            .first()
+        )
+
+    # 🔥 O username só vem no resultado: guarda as permissões apenas se nada foi invalidado durante a query
+    permission_changes = permission_resolver.cache.changes()
+    access_token = await db_sync_to_async(get_access_token)()
+
+    if access_token is None or access_token.is_expired():
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token inválido ou expirado")
 
-    username = token_data.get("username")
-    if not username:
+    user = access_token.user
+    if user is None:
         raise HTTPException(status_code=403, detail="Usuário não encontrado no token")
+    if user.is_deleted:
+        raise HTTPException(status_code=403, detail="Usuário não encontrado no banco")
+
+    permission_resolver.prime(
+        user.get_username(), user.pk, access_token.permission_codenames, changes=permission_changes
+    )
 
-    # 🔥 Buscar permissões diretamente do banco (SEM API DO DJANGO)
-    def get_permissions():
+    return {
+        "active": True,
+        "scope": access_token.scope,
+        "exp": int(access_token.expires.timestamp()),
+        "client_id": access_token.application.client_id if access_token.application else None,
+        "username": user.get_username(),
+    }
+
+
+# 🔥 Backends de validação disponíveis (`TOKEN_VALIDATION_BACKEND` no .env)
+TOKEN_VALIDATION_BACKENDS = {
+    "http": introspect_token_http,
+    "db": introspect_token_db,
+}
+
+if settings.TOKEN_VALIDATION_BACKEND not in TOKEN_VALIDATION_BACKENDS:
+    raise ImproperlyConfigured(
+        f"TOKEN_VALIDATION_BACKEND inválido: {settings.TOKEN_VALIDATION_BACKEND!r}. "
+        f"Opções: {', '.join(TOKEN_VALIDATION_BACKENDS)}"
+    )
+
+if settings.ACCESS_TOKEN_FORMAT not in ("opaque", "jwt"):
+    raise ImproperlyConfigured(f"ACCESS_TOKEN_FORMAT inválido: {settings.ACCESS_TOKEN_FORMAT!r}. Opções: opaque, jwt")
+
+
+async def validate_token(token: str, cache_key: str) -> dict:
+    """Valida o token no backend configurado e guarda o resultado no cache"""
+    introspect = TOKEN_VALIDATION_BACKENDS[settings.TOKEN_VALIDATION_BACKEND]
+    generation = token_cache.generation(cache_key)  # 🔥 Revogação durante a introspecção não fica em cache
+    token_data = await introspect(token)
+
+    # 🔥 Nunca mantém em cache além da expiração do próprio token
+    ttl = token_cache.ttl
+    if token_data.get("exp"):
+        ttl = min(ttl, token_data["exp"] - time.time())
+    token_cache.set(cache_key, token_data, ttl=ttl, generation=generation)
+
+    return token_data
+
+
+@timed("auth")
+async def verify_token(request: Request, credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
+    """
+    Verifica se o token OAuth2 é válido e busca as permissões do usuário.
+    A validação fica em cache (chave = hash do token) até o TTL ou o `exp` do token, o que vier antes;
+    as permissões vêm do `permission_resolver`, invalidado na hora em todos os workers da máquina quando mudam.
+    Tokens JWT (`ACCESS_TOKEN_FORMAT=jwt`) são validados só em memória, sem cache nem I/O.
+    Requisições simultâneas com o mesmo token compartilham uma única validação (single-flight),
+    e tokens recusados ficam no cache negativo por alguns segundos.
+    O `Principal` resolvido fica em `request.state.principal` (ver `authenticate_token`).
+    """
+    token = credentials.credentials
+
+    if settings.ACCESS_TOKEN_FORMAT == "jwt" and jwt_tokens.is_jwt(token):
         try:
-            user = CustomUser.objects.get(username=username)
-            return list(user.user_permissions.values_list("codename", flat=True))
-        except CustomUser.DoesNotExist:
-            return None
+            token_data = jwt_tokens.decode_access_token(token)
+        except jwt_tokens.InvalidToken:
+            raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token inválido ou expirado")
 
-    user_permissions = await sync_to_async(get_permissions)()  # 🔥 Executa de forma assíncrona
+        request.state.principal = Principal.from_token(token_data, token_data["user_id"], token_data["permissions"])
+        return token_data
 
-    if user_permissions is None:
-        raise HTTPException(status_code=403, detail="Usuário não encontrado no banco")
+    cache_key = hash_credential(token)
+    check_rejected(request, "token", cache_key)
+
+    try:
+        token_data = token_cache.get(cache_key)
+        if token_data is None:
+            token_data = await token_flight.do(cache_key, validate_token, token, cache_key)
 
-    token_data["permissions"] = user_permissions  # Adiciona permissões ao token
+        user_id, user_permissions = await resolve_permissions(token_data["username"])
+    except HTTPException as exc:
+        if exc.status_code in (401, 403):  # 🔥 Recusas definitivas; 502/503 (backend fora) não ficam em cache
+            remember_rejection(request, "token", cache_key, exc)
+        raise
 
-    return token_data  # Agora inclui permissões
+    request.state.principal = Principal.from_token(token_data, user_id, user_permissions)
+    return {**token_data, "permissions": user_permissions}  # Agora inclui permissões
+
+
+async def authenticate_token(request: Request, token_data: dict = Depends(verify_token)) -> Principal:
+    """Dependência que retorna o `Principal` tipado do token OAuth2 (usuário, permissões, dados do token)"""
+    return request.state.principal
 
 
 def check_permission(required_permission: str):
     """
     Middleware para verificar se o usuário tem uma permissão específica.
+    As permissões já chegam resolvidas como `frozenset`, então a checagem é só memória.
     """
     async def has_permission(user_data: dict = Depends(verify_token)):
-        user_permissions = user_data.get("permissions", [])
+        user_permissions = user_data.get("permissions", frozenset())
         if required_permission not in user_permissions:
             raise HTTPException(status_code=403, detail=f"Permissão `{required_permission}` necessária")
         return user_data
     return has_permission
 
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
-    """Valida a API Key de forma eficiente sem SQL direto"""
+@timed("auth")
+async def verify_api_key(request: Request, api_key: str = Security(api_key_header)):
+    """Valida a API Key pelo índice em memória, sem consultar o banco a cada requisição"""
 
     if not api_key:
         raise HTTPException(status_code=403, detail="API Key ausente")
 
-    # 🔥 Consulta ao banco de forma síncrona para evitar bloqueio no FastAPI
-    def get_api_key():
-        return APIKey.objects.filter(
-            Q(key=api_key, revoked=False) & (Q(expires_at__gte=now()) | Q(expires_at__isnull=True))
-        ).first()
+    key_hash = hash_credential(api_key)
+    check_rejected(request, "apikey", key_hash)
+
+    # 🔥 Só vai ao banco para (re)carregar o índice inteiro, uma vez só mesmo com várias requisições simultâneas
+    if apikey_index.is_stale():
+        await apikey_flight.do("load", db_sync_to_async(apikey_index.load))
 
-    key_instance = await sync_to_async(get_api_key)()  # 🔥 Executa de forma assíncrona
+    key_instance = apikey_index.lookup(api_key)
+
+    # 🔥 Prefixo desconhecido: a chave pode ter sido criada em outro worker depois do último carregamento
+    if key_instance is None and not apikey_index.contains(api_key):
+        key_instance = await apikey_flight.do(("fetch", key_hash), db_sync_to_async(apikey_index.fetch), api_key)
 
     if not key_instance:
-        raise HTTPException(status_code=403, detail="API Key inválida ou expirada")
+        exc = HTTPException(status_code=403, detail="API Key inválida ou expirada")
+        remember_rejection(request, "apikey", key_hash, exc)
+        raise exc
 
+    request.state.principal = Principal.from_api_key(key_instance)
     return key_instance  # Retorna o objeto da API Key
 
 
-import httpx
+async def authenticate_api_key(request: Request, api_key: APIKey = Depends(verify_api_key)) -> Principal:
+    """Dependência que retorna o `Principal` tipado da API Key"""
+    return request.state.principal
+
+
 from fastapi import APIRouter, Depends, HTTPException
 from starlette.responses import JSONResponse
 from core.settings import DJANGO_OAUTH2_TOKEN_URL
@@ -132,10 +317,24 @@ async def get_oauth_token(username: str, password: str, client_id: str, client_s
         "client_secret": client_secret,
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(DJANGO_OAUTH2_TOKEN_URL, data=payload)
+    response = await http_client.post(DJANGO_OAUTH2_TOKEN_URL, data=payload)
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail=response.json())
 
-    return JSONResponse(content=response.json(), status_code=200)
\ No newline at end of file
+    token_response = response.json()
+
+    # 🔥 Troca o token opaco por um JWT assinado com as permissões embutidas
+    if settings.ACCESS_TOKEN_FORMAT == "jwt":
+        user_id, user_permissions = await resolve_permissions(username)
+        token_response["access_token"] = jwt_tokens.encode_access_token(
+            opaque_token=token_response["access_token"],
+            user_id=user_id,
+            username=username,
+            permissions=user_permissions,
+            scope=token_response.get("scope", ""),
+            expires_in=token_response["expires_in"],
+            client_id=client_id,
+        )
+
+    return JSONResponse(content=token_response, status_code=200)
\ No newline at end of file
@@ -0,0 +1,70 @@
+import httpx
+from django.conf import settings
+from prometheus_client import Counter, Gauge
+
+from api.timing import phase
+
+# 🔥 Métricas de saturação do pool (expostas em /metrics pelo Instrumentator)
+HTTP_CLIENT_IN_FLIGHT = Gauge(
+    "nsgates_http_client_in_flight_requests",
+    "Requisições em andamento no cliente HTTP compartilhado",
+)
+HTTP_CLIENT_MAX_CONNECTIONS = Gauge(
+    "nsgates_http_client_max_connections",
+    "Limite de conexões do pool do cliente HTTP compartilhado",
+)
+HTTP_CLIENT_POOL_TIMEOUTS = Counter(
+    "nsgates_http_client_pool_timeouts_total",
+    "Requisições que esgotaram o tempo aguardando uma conexão livre no pool",
+)
+
+_client = None
+
+
+def build_client() -> httpx.AsyncClient:
+    """Cria o cliente HTTP com keep-alive, limites de pool e timeouts configuráveis"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, pool=settings.HTTP_CLIENT_POOL_TIMEOUT),
+    )
+
+
+async def startup():
+    """Abre o cliente compartilhado (chamado no lifespan do FastAPI)"""
+    global _client
+    if _client is None:
+        _client = build_client()
+    HTTP_CLIENT_MAX_CONNECTIONS.set(settings.HTTP_CLIENT_MAX_CONNECTIONS)
+
+
+async def shutdown():
+    """Fecha o cliente compartilhado e suas conexões keep-alive"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Retorna o cliente compartilhado, criando-o se o lifespan não rodou (ex: scripts e testes)"""
+    global _client
+    if _client is None:
+        _client = build_client()
+    return _client
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    """Faz um POST usando o pool compartilhado, registrando as métricas de saturação"""
+    HTTP_CLIENT_IN_FLIGHT.inc()
+    try:
+        with phase("oauth"):  # 🔥 Tempo gasto no servidor OAuth2 (introspecção / emissão de token)
+            return await get_client().post(url, **kwargs)
+    except httpx.PoolTimeout:
+        HTTP_CLIENT_POOL_TIMEOUTS.inc()
+        raise
+    finally:
+        HTTP_CLIENT_IN_FLIGHT.dec()
@@ -1,11 +1,11 @@
 import os
+import asyncio
 import django
 import importlib
 import pkgutil
 import logging
-import json
 from logging.handlers import TimedRotatingFileHandler
-import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from prometheus_fastapi_instrumentator import Instrumentator
@@ -15,8 +15,6 @@ from django.conf import settings
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 django.setup()
 
-RATE_LIMIT = settings.RATE_LIMIT
-
 # 🔥 Diretório dos logs organizados por API
 LOG_DIR = "logs/api"
 os.makedirs(LOG_DIR, exist_ok=True)  # 🔥 Garante que o diretório existe
@@ -37,14 +35,40 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends
 from api.auth import verify_token
 from api.auth import verify_api_key
 from core.routers import user
+from api import http_client
+from api.access_log import access_log
+from api.timing import TimedJSONResponse
+from core.jwt_tokens import denylist
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Abre e fecha os recursos compartilhados por todas as requisições do worker"""
+    await http_client.startup()  # 🔥 Pool HTTP único para introspecção e proxy de token
+    access_log.start()  # 🔥 Thread que grava o log de acesso em lote
+
+    # 🔥 Sincroniza revogações de JWT feitas em outros workers
+    denylist_refresher = None
+    if settings.ACCESS_TOKEN_FORMAT == "jwt":
+        denylist_refresher = asyncio.create_task(denylist.run_refresher(settings.JWT_DENYLIST_REFRESH_INTERVAL))
+
+    yield
+
+    if denylist_refresher:
+        denylist_refresher.cancel()
+    await http_client.shutdown()
+    access_log.stop()
+
 
 app = FastAPI(
     title="NSGates API",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,  # 🔥 Mede a serialização no `Server-Timing`
     swagger_ui_parameters={
         "persistAuthorization": True,  # 🔥 Mantém a autenticação após recarregar
         "docExpansion": "none",  # 🔥 Minimiza os endpoints por padrão
@@ -53,63 +77,10 @@ app = FastAPI(
 )
 
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
-
-# 🔥 Criar o Rate Limiter armazenando os limites em memória
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-
-# 🔥 Tratamento de erro quando atingir o limite
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_error(request, exc: RateLimitExceeded):
-    return JSONResponse(
-        status_code=429,
-        content={"detail": "Muitas requisições! Tente novamente mais tarde."},
-    )
-
-
-# 🔥 Middleware para logar requisições com tempo de resposta
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()  # ⏳ Marca o início da requisição
-
-    log_data = {
-        "method": request.method,
-        "url": str(request.url),
-        "headers": dict(request.headers),
-        "client": request.client.host,
-    }
-    logger.info(json.dumps(log_data))  # 🔥 Log da requisição recebida
-
-    response = await call_next(request)  # 🔥 Processa a requisição
-
-    duration = round(time.time() - start_time, 4)  # ⏳ Calcula tempo de resposta
-
-    logger.info(json.dumps({
-        "status_code": response.status_code,
-        "method": request.method,
-        "url": str(request.url),
-        "response_time": f"{duration}s",  # 🔥 Tempo de resposta adicionado!
-    }))
-
-    return response
-
-
-@app.middleware("http")
-async def rate_limit_middleware(request, call_next):
-    """Middleware global para aplicar Rate Limiting corretamente"""
-    try:
-        response = await limiter.limit(f"{RATE_LIMIT}/minute")(call_next)(request)
-        return response
-    except RateLimitExceeded as exc:
-        logger.warning(f"🔥 Rate limit atingido: {exc.detail}")
-        return JSONResponse(
-            status_code=429,
-            content={"detail": "Muitas requisições! Tente novamente mais tarde."},
-        )
+from api.middleware import GatewayMiddleware
+
+# 🔥 Rate limiting, tempo de resposta e log de acesso em um único middleware ASGI puro
+app.add_middleware(GatewayMiddleware)
 
 
 # 🔥 Incluindo os roteadores dinâmicos
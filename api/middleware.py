@@ -0,0 +1,84 @@
+import logging
+import time
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection
+
+from api.access_log import access_log
+from api.ratelimit import resolve_rate_limit
+from api.timing import RequestTimings, current_timings, is_trusted, phase, route_template
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayMiddleware:
+    """
+    Middleware ASGI puro que concentra rate limiting, tempo por fase e log de acesso.
+    Diferente do `@app.middleware("http")` (BaseHTTPMiddleware), não cria task nem stream intermediário
+    por requisição: só repassa as mensagens ASGI, acrescentando os cabeçalhos `RateLimit-*` no `http.response.start`.
+    As fases medidas (`api.timing`) vão para os histogramas do Prometheus e, para redes confiáveis, no `Server-Timing`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()  # ⏳ Marca o início da requisição
+        timings = RequestTimings()
+        timings_token = current_timings.set(timings)
+        connection = HTTPConnection(scope)
+        status_code = 500
+
+        with phase("ratelimit"):
+            rate_limit, identity = resolve_rate_limit(connection)
+            allowed, remaining, reset = rate_limit.hit(identity)
+        headers = rate_limit.headers(remaining, reset)
+        show_timing = connection.client is not None and is_trusted(connection.client.host)
+
+        try:
+            if not allowed:
+                status_code = 429
+                logger.warning(f"🔥 Rate limit atingido: plano {rate_limit.tier} ({identity})")
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Muitas requisições! Tente novamente mais tarde."},
+                    headers={**headers, "Retry-After": str(reset)},
+                )
+                await response(scope, receive, send)
+                return
+
+            raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+            async def send_with_headers(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    message["headers"] = [*message.get("headers", ()), *raw_headers]
+                    if show_timing:
+                        timings.phases["total"] = time.perf_counter() - start_time  # 🔥 Até o início da resposta
+                        message["headers"].append((b"server-timing", timings.server_timing().encode("latin-1")))
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            duration = time.perf_counter() - start_time
+            current_timings.reset(timings_token)
+            timings.phases["total"] = duration
+            timings.observe(route_template(scope))
+
+            access_log.log({
+                "ts": datetime.now().isoformat(timespec="milliseconds"),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "client": connection.client.host if connection.client else None,
+                "user_agent": connection.headers.get("user-agent"),
+                "status_code": status_code,
+                "rate_limit_tier": rate_limit.tier,
+                "response_time": round(duration, 4),  # ⏳ Segundos
+            })
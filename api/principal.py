@@ -0,0 +1,48 @@
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.models.apikey import APIKey
+from core.models.user import CustomUser
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Identidade autenticada da requisição, resolvida uma única vez em `verify_token`/`verify_api_key`
+    e guardada em `request.state.principal` para roteadores e histórico reaproveitarem sem novas queries.
+    """
+
+    user_id: Optional[uuid.UUID] = None
+    username: Optional[str] = None
+    permissions: frozenset = frozenset()
+    user: Optional[CustomUser] = None  # 🔥 Instância leve (só pk e username), suficiente para o histórico
+    api_key: Optional[APIKey] = None
+    token_data: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_token(cls, token_data: dict, user_id, permissions: frozenset):
+        if not isinstance(user_id, uuid.UUID):
+            user_id = uuid.UUID(str(user_id))
+        username = token_data["username"]
+        return cls(
+            user_id=user_id,
+            username=username,
+            permissions=permissions,
+            user=CustomUser(pk=user_id, username=username),
+            token_data=token_data,
+        )
+
+    @classmethod
+    def from_api_key(cls, api_key: APIKey):
+        return cls(api_key=api_key)
+
+    @property
+    def display_name(self) -> str:
+        """Nome usado nas mensagens e no motivo da alteração no histórico"""
+        if self.api_key is not None:
+            return f"API Key: {self.api_key.name}"
+        return self.username
+
+    def has_permission(self, codename: str) -> bool:
+        return codename in self.permissions
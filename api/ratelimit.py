@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import struct
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from slowapi.util import get_remote_address
+
+from core.apikey_index import apikey_index
+from core.cache import hash_credential, token_cache
+from core import jwt_tokens
+from core.shared_memory import HEADER, SharedTable, default_storage_path
+
+logger = logging.getLogger(__name__)
+
+_SLOT = struct.Struct("<QqII")  # 🔥 hash da chave, janela atual, contagem atual, contagem da janela anterior
+_MAGIC = b"NSGRL001"
+_BUCKET_SLOTS = 4  # 🔥 Slots por bucket: colisões de hash ocupam o próximo slot livre do mesmo bucket
+
+
+class SlidingWindowCounter:
+    """
+    Contador de janela deslizante compartilhado entre os workers via arquivo mapeado em memória (`/dev/shm`).
+    Cada chave ocupa um slot fixo de uma tabela hash; a atualização trava só o bucket da chave
+    (`fcntl.lockf` por faixa de bytes), então cada requisição custa O(1) e nenhuma ida à rede.
+    A estimativa é `anterior * (1 - fração decorrida da janela) + atual`.
+    """
+
+    def __init__(self, path: str = None, slots: int = 65536):
+        self.slots = max(_BUCKET_SLOTS, slots - slots % _BUCKET_SLOTS)
+        self._table = SharedTable(path, _MAGIC, self.slots, _SLOT.size)
+        self._buf = self._table.buf
+
+    @staticmethod
+    def _key_hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+    def _find_slot(self, bucket_offset: int, key_hash: int, window_index: int) -> int:
+        """Slot da chave no bucket; senão um livre/expirado; senão o de menor uso (despejo)"""
+        candidate, candidate_score = None, None
+        for i in range(_BUCKET_SLOTS):
+            offset = bucket_offset + i * _SLOT.size
+            slot_hash, slot_window, current, previous = _SLOT.unpack_from(self._buf, offset)
+            if slot_hash == key_hash:
+                return offset
+            if slot_hash == 0 or slot_window < window_index - 1:
+                score = -1
+            else:
+                score = current + previous
+            if candidate is None or score < candidate_score:
+                candidate, candidate_score = offset, score
+        _SLOT.pack_into(self._buf, candidate, key_hash, window_index, 0, 0)
+        return candidate
+
+    def hit(self, key: str, limit: int, window: int, now: float = None):
+        """
+        Registra uma requisição para `key` se ainda houver cota.
+        Retorna `(permitido, restante, segundos_para_reset)`.
+        """
+        now = time.time() if now is None else now
+        window_index = int(now // window)
+        key_hash = self._key_hash(key)
+        bucket_offset = HEADER.size + (key_hash % (self.slots // _BUCKET_SLOTS)) * _BUCKET_SLOTS * _SLOT.size
+
+        with self._table.locked(bucket_offset, _BUCKET_SLOTS * _SLOT.size):
+            offset = self._find_slot(bucket_offset, key_hash, window_index)
+            _, slot_window, current, previous = _SLOT.unpack_from(self._buf, offset)
+
+            if slot_window != window_index:
+                previous = current if slot_window == window_index - 1 else 0
+                current = 0
+
+            elapsed = (now % window) / window
+            estimate = previous * (1 - elapsed) + current
+            allowed = estimate + 1 <= limit
+            if allowed:
+                current += 1
+                estimate += 1
+
+            _SLOT.pack_into(self._buf, offset, key_hash, window_index, current, previous)
+
+        remaining = max(0, int(limit - estimate))
+        reset = int(window - now % window) or window
+        return allowed, remaining, reset
+
+    def close(self):
+        self._table.close()
+
+
+# 🔥 Um contador por worker, todos apontando para o mesmo arquivo em memória compartilhada
+rate_limiter = SlidingWindowCounter(
+    path=settings.RATE_LIMIT_STORAGE_PATH or default_storage_path("nsgates-ratelimit"),
+    slots=settings.RATE_LIMIT_SLOTS,
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Cota de um plano (tier), montada uma única vez a partir de `RATE_LIMIT_TIERS`"""
+
+    tier: str
+    limit: int
+    window: int
+
+    @classmethod
+    def parse(cls, tier: str, rate) -> "RateLimit":
+        """Aceita `"100/minute"` (second, minute, hour, day) ou só o número, usando `RATE_LIMIT_WINDOW`"""
+        amount, _, period = str(rate).partition("/")
+        window = _PERIODS[period.strip().rstrip("s")] if period else settings.RATE_LIMIT_WINDOW
+        return cls(tier=tier, limit=int(amount), window=window)
+
+    def hit(self, identity: str):
+        """Consome uma requisição da cota de `identity` neste plano"""
+        return rate_limiter.hit(f"{self.tier}:{identity}", self.limit, self.window)
+
+    def headers(self, remaining: int, reset: int) -> dict:
+        return {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(reset),
+        }
+
+
+# 🔥 Planos pré-compilados no carregamento do worker (nada é reprocessado por requisição)
+rate_limit_tiers = {tier: RateLimit.parse(tier, rate) for tier, rate in settings.RATE_LIMIT_TIERS.items()}
+
+
+def _bearer_username(token: str):
+    """Usuário do bearer token já validado (JWT ou cache de introspecção), sem I/O"""
+    if settings.ACCESS_TOKEN_FORMAT == "jwt" and jwt_tokens.is_jwt(token):
+        try:
+            return jwt_tokens.decode_access_token(token)["username"]
+        except jwt_tokens.InvalidToken:
+            return None
+    token_data = token_cache.get(hash_credential(token))
+    return token_data["username"] if token_data else None
+
+
+def resolve_rate_limit(request):
+    """
+    Escolhe o plano e a identidade da requisição: API Key válida (plano da chave), usuário OAuth2 (`user`)
+    ou, sem credencial conhecida, o IP (`anonymous`). Só consulta estruturas em memória.
+    Credenciais ainda não vistas caem no IP até a primeira autenticação completa.
+    """
+    raw_key = request.headers.get("X-API-Key")
+    if raw_key:
+        key = apikey_index.lookup(raw_key)
+        if key is not None:
+            tier = rate_limit_tiers.get(key.rate_limit_tier)
+            if tier is None:
+                logger.warning(f"Plano de rate limit desconhecido `{key.rate_limit_tier}` na API Key {key.prefix}")
+                tier = rate_limit_tiers["apikey"]
+            return tier, f"key:{key.prefix}"
+
+    authorization = request.headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        username = _bearer_username(authorization[7:])
+        if username:
+            return rate_limit_tiers["user"], f"user:{username}"
+
+    return rate_limit_tiers["anonymous"], f"ip:{get_remote_address(request)}"
@@ -0,0 +1,36 @@
+import asyncio
+
+from prometheus_client import Counter
+
+SINGLEFLIGHT_CALLS = Counter(
+    "nsgates_auth_singleflight_calls_total",
+    "Chamadas de autenticação por tipo: `leader` executou a busca, `coalesced` reaproveitou uma em andamento",
+    ["kind", "result"],
+)
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave em uma única busca em andamento.
+    A busca roda em uma task separada, então o cancelamento de quem a iniciou não derruba os demais.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._calls = {}  # 🔥 chave -> task em andamento
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, fn, *args):
+        """Executa `await fn(*args)` uma única vez por chave enquanto houver uma chamada em andamento"""
+        task = self._calls.get(key)
+        if task is None:
+            SINGLEFLIGHT_CALLS.labels(self.kind, "leader").inc()
+            task = asyncio.ensure_future(fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            SINGLEFLIGHT_CALLS.labels(self.kind, "coalesced").inc()
+
+        return await asyncio.shield(task)
@@ -0,0 +1,122 @@
+import functools
+import ipaddress
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from fastapi.responses import JSONResponse
+from prometheus_client import Histogram
+
+PHASE_SECONDS = Histogram(
+    "nsgates_request_phase_seconds",
+    "Tempo por fase da requisição (auth inclui oauth e db feitos durante a autenticação)",
+    ["route", "phase"],
+)
+DB_QUERIES = Histogram(
+    "nsgates_request_db_queries",
+    "Queries executadas por requisição",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+
+# 🔥 Redes que recebem o cabeçalho `Server-Timing` (não expor detalhes internos a qualquer cliente)
+TRUSTED_NETWORKS = [ipaddress.ip_network(network) for network in settings.SERVER_TIMING_TRUSTED_NETWORKS]
+
+
+class RequestTimings:
+    """Tempos acumulados por fase de uma requisição, em segundos"""
+
+    def __init__(self):
+        self.phases = {}
+        self.db_queries = 0
+
+    def add(self, name: str, duration: float):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def server_timing(self) -> str:
+        """Valor do cabeçalho `Server-Timing` (durações em milissegundos)"""
+        entries = []
+        for name, duration in self.phases.items():
+            entry = f"{name};dur={duration * 1000:.2f}"
+            if name == "db":
+                entry += f';desc="{self.db_queries} queries"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def observe(self, route: str):
+        for name, duration in self.phases.items():
+            PHASE_SECONDS.labels(route, name).observe(duration)
+        DB_QUERIES.labels(route).observe(self.db_queries)
+
+
+current_timings: ContextVar = ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Mede o bloco e soma na fase `name` da requisição atual (sem requisição em andamento, não faz nada)"""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator de funções async (ex: dependências do FastAPI) que mede a chamada como a fase `name`"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with phase(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_trusted(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_NETWORKS)
+
+
+def route_template(scope) -> str:
+    """Template da rota (ex: `/o/customusers/{item_id}`), para não criar uma série por ID"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def db_timer(execute, sql, params, many, context):
+    """`execute_wrapper` do Django: soma o tempo e a quantidade de queries na requisição atual"""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("db", time.perf_counter() - start)
+        timings.db_queries += 1
+
+
+@receiver(connection_created)
+def install_db_timer(sender, connection, **kwargs):
+    """Instala o `db_timer` em toda conexão nova (cada thread do pool do banco abre a sua)"""
+    if db_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_timer)
+
+
+class TimedJSONResponse(JSONResponse):
+    """Resposta JSON padrão da API, medindo a serialização como a fase `serialize`"""
+
+    def render(self, content) -> bytes:
+        with phase("serialize"):
+            return super().render(content)
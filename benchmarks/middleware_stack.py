@@ -0,0 +1,125 @@
+"""
+Compara o custo por requisição da pilha de middlewares da API:
+
+- `base_http`: rate limiting e log de acesso como dois `@app.middleware("http")` (BaseHTTPMiddleware), como antes;
+- `asgi`: o `GatewayMiddleware` (ASGI puro) usado hoje em `api/main.py`.
+
+As duas pilhas fazem o mesmo trabalho (mesmo contador, mesmo writer de log, CORS e Prometheus),
+então a diferença medida é só a da arquitetura dos middlewares.
+
+Uso: python benchmarks/middleware_stack.py [--requests 20000] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+os.environ.setdefault("RATE_LIMIT", "1000000000")
+os.environ.setdefault("RATE_LIMIT_STORAGE_PATH", os.path.join(tempfile.mkdtemp(), "ratelimit"))
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from prometheus_fastapi_instrumentator import Instrumentator  # noqa: E402
+
+from api.access_log import access_log  # noqa: E402
+from api.middleware import GatewayMiddleware  # noqa: E402
+from api.ratelimit import resolve_rate_limit  # noqa: E402
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/status")
+    def status():
+        return {"status": "online"}
+
+    if stack == "asgi":
+        app.add_middleware(GatewayMiddleware)
+    else:
+        @app.middleware("http")
+        async def log_requests(request: Request, call_next):
+            start_time = time.perf_counter()
+            response = await call_next(request)
+            access_log.log({
+                "method": request.method,
+                "path": request.url.path,
+                "status_code": response.status_code,
+                "response_time": round(time.perf_counter() - start_time, 4),
+            })
+            return response
+
+        @app.middleware("http")
+        async def rate_limit_middleware(request, call_next):
+            rate_limit, identity = resolve_rate_limit(request)
+            allowed, remaining, reset = rate_limit.hit(identity)
+            if not allowed:
+                return JSONResponse(status_code=429, content={"detail": "Muitas requisições!"})
+            response = await call_next(request)
+            response.headers.update(rate_limit.headers(remaining, reset))
+            return response
+
+    Instrumentator().instrument(app)
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    return app
+
+
+async def run(stack: str, total: int, concurrency: int, trace_memory: bool = False) -> float:
+    """Executa `total` requisições com `concurrency` clientes; retorna o tempo ou o pico de memória (bytes)"""
+    app = build_app(stack)
+    transport = httpx.ASGITransport(app=app)
+    remaining = total
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/status")  # 🔥 Aquecimento (monta a pilha de middlewares)
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get("/status")
+                assert response.status_code == 200
+
+        if trace_memory:  # 🔥 tracemalloc distorce o tempo, então a memória é medida em uma rodada separada
+            tracemalloc.start()
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    access_log.log_dir = tempfile.mkdtemp()
+    access_log.start()
+    try:
+        print(f"{'pilha':<10} {'req/s':>10} {'µs/req':>10} {'KiB/req em voo':>16}")
+        for stack in ("base_http", "asgi"):
+            elapsed = asyncio.run(run(stack, args.requests, args.concurrency))
+            peak = asyncio.run(run(stack, args.concurrency * 5, args.concurrency, trace_memory=True))
+            print(f"{stack:<10} {args.requests / elapsed:>10.0f} {elapsed / args.requests * 1e6:>10.1f} "
+                  f"{peak / args.concurrency / 1024:>16.1f}")
+    finally:
+        access_log.stop()
+
+
+if __name__ == "__main__":
+    main()
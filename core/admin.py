@@ -11,6 +11,7 @@ from django.utils.html import format_html
 from simple_history.utils import update_change_reason
 from oauth2_provider.models import AccessToken, IDToken , Application , Grant, RefreshToken
 from .models.apikey import APIKey
+from .apikey_index import apikey_index
 
 import os
 import environ
@@ -130,16 +131,31 @@ class RefreshTokenAdmin(admin.ModelAdmin):
 
 @admin.register(APIKey)
 class APIKeyAdmin(admin.ModelAdmin):
-    list_display = ("name", "key", "expires_at", "revoked", "created_at", "updated_at")
-    readonly_fields = ("key", "created_at", "updated_at","deleted_at")
-    search_fields = ("name", "key")
-    list_filter = ("revoked", "expires_at")
+    list_display = ("name", "prefix", "rate_limit_tier", "expires_at", "revoked", "created_at", "updated_at")
+    readonly_fields = ("prefix", "created_at", "updated_at","deleted_at")
+    search_fields = ("name", "prefix")
+    list_filter = ("revoked", "rate_limit_tier", "expires_at")
 
     actions = ["revoke_selected_keys"]
 
+    def save_model(self, request, obj, form, change):
+        """Gera a chave ao criar e exibe para cópia, pois apenas o hash fica salvo"""
+        super().save_model(request, obj, form, change)
+        raw_key = getattr(obj, "raw_key", None)
+        if raw_key:
+            messages.success(
+                request,
+                format_html(
+                    '<strong>Sua API Key gerada:</strong> <code>{}</code><br>'
+                    '<span style="color:red;">⚠️ Guarde essa chave agora, pois ela não será exibida novamente!</span>',
+                    raw_key
+                )
+            )
+
     def revoke_selected_keys(self, request, queryset):
         """Revoga múltiplas chaves selecionadas no admin"""
         queryset.update(revoked=True)
+        apikey_index.invalidate()  # 🔥 `update()` não dispara signals: recarrega o índice em todos os workers
         self.message_user(request, f"{queryset.count()} chaves de API foram revogadas com sucesso.", level="success")
 
     revoke_selected_keys.short_description = "Revogar chaves selecionadas"    
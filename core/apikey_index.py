@@ -0,0 +1,140 @@
+import copy
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from core.generations import generations
+from core.models.apikey import APIKey
+
+
+class APIKeyIndex:
+    """
+    Índice em memória das API Keys ativas: prefixo público -> instância (que só guarda o hash do segredo).
+    Um min-heap por `expires_at` remove as chaves expiradas em O(log n), sem varrer o índice.
+    Qualquer alteração (signals, admin, lote) incrementa uma geração em `SharedGenerations`: todos os workers
+    da máquina param de usar o índice na hora e o recarregam na próxima validação.
+    Workers em outras máquinas só veem a alteração no recarregamento periódico (`refresh_interval`).
+    Uma chave ainda fora do índice (ex: criada em outra máquina) é buscada pelo prefixo (`fetch`).
+    """
+
+    NAMESPACE = "apikeys"
+
+    def __init__(self, refresh_interval: float = 30, shared=None):
+        self.refresh_interval = refresh_interval
+        self.shared = shared or generations
+        self._keys = {}
+        self._expirations = []  # 🔥 heap de (expira_em_epoch, prefixo)
+        self._loaded_at = None
+        self._generation = None  # 🔥 Geração lida antes do último carregamento
+        self._lock = threading.Lock()
+
+    def _is_current(self) -> bool:
+        return self._generation is None or self._generation == self.shared.get(self.NAMESPACE)
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or not self._is_current()
+            or time.monotonic() - self._loaded_at > self.refresh_interval
+        )
+
+    def load(self):
+        """Carrega todas as chaves ativas do banco (uma query) e reconstrói o heap"""
+        if not self.is_stale():
+            return  # 🔥 Outra chamada concorrente já recarregou
+
+        generation = self.shared.get(self.NAMESPACE)  # 🔥 Alteração durante a query força outro recarregamento
+        active_keys = APIKey.objects.filter(
+            Q(revoked=False) & (Q(expires_at__gt=now()) | Q(expires_at__isnull=True))
+        )
+        keys = {key.prefix: key for key in active_keys}
+        expirations = [
+            (key.expires_at.timestamp(), prefix) for prefix, key in keys.items() if key.expires_at
+        ]
+        heapq.heapify(expirations)
+
+        with self._lock:
+            self._keys = keys
+            self._expirations = expirations
+            self._loaded_at = time.monotonic()
+            self._generation = generation
+
+    def _expire(self):
+        current_time = time.time()
+        while self._expirations and self._expirations[0][0] <= current_time:
+            with self._lock:
+                if not self._expirations or self._expirations[0][0] > current_time:
+                    break
+                expires_at, prefix = heapq.heappop(self._expirations)
+                key = self._keys.get(prefix)
+                # 🔥 Entradas antigas do heap (chave atualizada depois) são só descartadas
+                if key is not None and key.expires_at and key.expires_at.timestamp() == expires_at:
+                    del self._keys[prefix]
+
+    def contains(self, raw_key: str) -> bool:
+        """O prefixo da chave informada está no índice? (mesmo com segredo errado)"""
+        prefix, _ = APIKey.split_key(raw_key)
+        return prefix in self._keys
+
+    def lookup(self, raw_key: str):
+        """
+        Retorna a APIKey ativa correspondente à chave informada, ou None. Só memória + um HMAC.
+        Se alguma chave mudou desde o carregamento, o índice não é usado até ser recarregado.
+        """
+        if not self._is_current():
+            return None
+        self._expire()
+        prefix, _ = APIKey.split_key(raw_key)
+        key = self._keys.get(prefix)
+        if key is None or not key.check_key(raw_key):
+            return None
+        return key
+
+    def fetch(self, raw_key: str):
+        """Busca a chave pelo prefixo (uma query indexada) e a inclui no índice; usado quando o prefixo não está nele"""
+        prefix, _ = APIKey.split_key(raw_key)
+        key = APIKey.objects.filter(prefix=prefix).first()
+        if key is None:
+            return None
+        self.update(key)
+        return key if self._is_active(key) and key.check_key(raw_key) else None
+
+    @staticmethod
+    def _is_active(key: APIKey) -> bool:
+        return not key.revoked and not key.is_deleted and (key.expires_at is None or key.expires_at > now())
+
+    def update(self, key: APIKey):
+        """Atualiza uma chave lida do banco só neste índice, incluindo-a ou removendo-a conforme o estado atual"""
+        with self._lock:
+            if not self._is_active(key):
+                self._keys.pop(key.prefix, None)
+                return
+            self._keys[key.prefix] = self._clean(key)
+            if key.expires_at:
+                heapq.heappush(self._expirations, (key.expires_at.timestamp(), key.prefix))
+
+    @staticmethod
+    def _clean(key: APIKey) -> APIKey:
+        """Cópia sem a chave completa (`raw_key`), que só existe na instância recém-criada"""
+        key = copy.copy(key)
+        key.__dict__.pop("raw_key", None)
+        return key
+
+    def invalidate(self):
+        """
+        Alguma chave mudou: todos os workers da máquina recarregam o índice na próxima validação.
+        Repete no commit: outro worker pode ter recarregado a versão antiga antes da transação terminar.
+        """
+        def invalidate():
+            self.shared.bump(self.NAMESPACE)
+
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+apikey_index = APIKeyIndex(refresh_interval=settings.APIKEY_INDEX_REFRESH_INTERVAL)
@@ -21,10 +21,12 @@ fastapi_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # 🔥 Cursor da paginação e ETag visíveis para clientes no navegador
 )
 
 # 🔥 Montar FastAPI na rota `/api`
-app = FastAPI(title="NSGates ASGI")
+# 🔥 Apps montados não recebem eventos de lifespan, então repassamos o do FastAPI interno
+app = FastAPI(title="NSGates ASGI", lifespan=fastapi_app.router.lifespan_context)
 app.mount("/api", fastapi_app)
 # 🔥 Montar Django na raiz `/`
 app.mount("/", django_asgi_app)
@@ -0,0 +1,141 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core.generations import generations
+
+
+def hash_credential(value: str) -> str:
+    """
+    Gera o hash SHA-256 de uma credencial (token ou API Key).
+    Usado como chave dos caches para nunca manter o segredo em memória.
+    Para tokens OAuth2 o resultado é igual ao `token_checksum` do `AccessToken`.
+    """
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Cache em memória com tamanho máximo, expiração por entrada (TTL) e despejo LRU.
+    Com `max_bytes`, também limita a soma dos tamanhos informados no `set`.
+    Thread-safe, pois é acessado tanto pelo event loop quanto pelas threads do pool do banco.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, max_bytes: int = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()  # 🔥 chave -> (expira_em, valor, tamanho), do menos para o mais recente
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Retorna o valor se existir e não tiver expirado, marcando-o como usado recentemente"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, value, _ = item
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None, size: int = 0):
+        """
+        Armazena um valor. `ttl` sobrescreve o TTL padrão (ex: limitado pelo `exp` do token).
+        `size` é o tamanho aproximado do valor em bytes, contabilizado no `max_bytes`.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            with self._lock:
+                self._pop(key)
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic() + ttl, value, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))  # 🔥 Remove o menos usado recentemente
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+_ANY_KEY = "\0changes"  # 🔥 Slot do contador de `SharedTTLCache.changes` (não colide com chaves reais)
+
+
+class SharedTTLCache(TTLCache):
+    """
+    `TTLCache` por worker cuja invalidação vale para todos os workers da máquina.
+    Cada entrada guarda as gerações (do namespace e da chave) lidas em `SharedGenerations`;
+    `delete`/`clear` incrementam essas gerações, e os outros workers descartam a entrada na próxima leitura.
+    Em outras máquinas a entrada só sai pelo TTL, que é o atraso máximo de uma revogação.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 1024, ttl: float = 60, shared=None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.namespace = namespace
+        self.shared = shared or generations
+
+    def generation(self, key):
+        """Gerações atuais da chave; leia antes da consulta ao backend e passe para o `set`"""
+        return self.shared.get(self.namespace), self.shared.get(self.namespace, key)
+
+    def changes(self) -> int:
+        """Contador de invalidações de qualquer chave: para consultas que só descobrem a chave no resultado"""
+        return self.shared.get(self.namespace, _ANY_KEY)
+
+    def get(self, key, default=None):
+        item = super().get(key)
+        if item is None:
+            return default
+        generation, value = item
+        if generation != self.generation(key):
+            super().delete(key)  # 🔥 Invalidada por outro worker
+            return default
+        return value
+
+    def set(self, key, value, ttl: float = None, generation=None):
+        """`generation` lida antes de buscar o valor: se houve invalidação no meio, a entrada já nasce vencida"""
+        super().set(key, (generation or self.generation(key), value), ttl=ttl)
+
+    def delete(self, key):
+        self.shared.bump(self.namespace, key)
+        self.shared.bump(self.namespace, _ANY_KEY)
+        super().delete(key)
+
+    def clear(self):
+        self.shared.bump(self.namespace)
+        self.shared.bump(self.namespace, _ANY_KEY)
+        super().clear()
+
+
+# 🔥 Cache da introspecção de tokens OAuth2 (chave = hash do bearer token). A revogação vale na hora para os
+# workers desta máquina; em outras máquinas, o token revogado ainda é aceito por até `TOKEN_CACHE_TTL` segundos
+token_cache = SharedTTLCache("tokens", maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+# 🔥 Cache negativo: credenciais recusadas recentemente (chave = (tipo, hash)) e recusas por origem
+rejected_credentials = TTLCache(maxsize=settings.NEGATIVE_CACHE_MAX_SIZE, ttl=settings.NEGATIVE_CACHE_TTL)
+rejections_by_source = TTLCache(maxsize=settings.NEGATIVE_CACHE_MAX_SIZE, ttl=settings.NEGATIVE_CACHE_TTL)
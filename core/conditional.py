@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Mapping, Optional
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+
+def make_etag(updated_at: datetime) -> str:
+    """ETag fraco derivado do `updated_at` (microssegundos em hexadecimal)"""
+    return f'W/"{int(updated_at.timestamp() * 1_000_000):x}"'
+
+
+def validator_headers(updated_at: datetime) -> dict:
+    """Cabeçalhos `ETag` e `Last-Modified` da versão atual do registro"""
+    return {"ETag": make_etag(updated_at), "Last-Modified": http_date(updated_at.timestamp())}
+
+
+def etag_matches(header: str, updated_at: datetime) -> bool:
+    """Comparação fraca (ignora o `W/`) entre a lista do cabeçalho e a versão atual; `*` casa com qualquer uma"""
+    etags = parse_etags(header)
+    current = make_etag(updated_at).removeprefix("W/")
+    return "*" in etags or any(etag.removeprefix("W/") == current for etag in etags)
+
+
+def is_conditional(headers: Mapping[str, str]) -> bool:
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def is_not_modified(headers: Mapping[str, str], updated_at: datetime) -> bool:
+    """
+    O cliente já tem a versão atual? `If-None-Match` tem precedência sobre `If-Modified-Since` (RFC 9110).
+    `Last-Modified` tem precisão de segundos, então a comparação por data também é feita em segundos.
+    """
+    if_none_match: Optional[str] = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, updated_at)
+    since = parse_http_date_safe(headers.get("if-modified-since") or "")
+    return since is not None and int(updated_at.timestamp()) <= since
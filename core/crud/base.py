@@ -1,22 +1,248 @@
+import base64
+import json
+import logging
+import orjson
 from fastapi import HTTPException
-from typing import Type, TypeVar, Generic, List
-from django.db import models
+from typing import Dict, Mapping, Optional, Tuple, Type, TypeVar, Generic, List
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+from core.conditional import etag_matches
+from core.crud.cache import crud_cache
+from core.crud.importer import copy_insert, read_rows
+from core.db_executor import db_sync_to_async
+from core.models.base import rows_changed
+
+logger = logging.getLogger(__name__)
 
 ModelType = TypeVar("ModelType", bound=models.Model)  # 🔥 Agora suporta Django ORM
 
+
+def encode_cursor(ordering: str, value, id) -> str:
+    """Cursor opaco com a ordenação e a posição `(valor, id)` do último item da página"""
+    # 🔥 `isoformat()` completo: o DjangoJSONEncoder corta os microssegundos e o cursor repetiria registros
+    raw = json.dumps([ordering, value, str(id)], default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, object, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ordering, value, id = json.loads(raw)
+        return ordering, value, id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def to_python(field: models.Field, value):
+    """Converte o valor da query string para o tipo do campo (400 se inválido)"""
+    if isinstance(field, models.BooleanField) and isinstance(value, str):
+        value = value.lower() in ("1", "true", "t", "yes")
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        raise HTTPException(status_code=400, detail=f"Valor inválido para `{field.name}`: {value}")
+
+
 class CRUDBase(Generic[ModelType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        readable_fields: Optional[List[str]] = None,
+        writable_fields: Optional[List[str]] = None,
+        filter_fields: Optional[Dict[str, str]] = None,
+        ordering_fields: Optional[List[str]] = None,
+        cache_ttl: Optional[float] = None,
+    ):
         self.model = model
+        # 🔥 Colunas expostas nas leituras via `.values()` (padrão: todas). Deixe de fora segredos como `password`
+        self.readable_fields = readable_fields or [field.attname for field in model._meta.concrete_fields]
+        # 🔥 Filtros da listagem: parâmetro da query string -> lookup do ORM (ex: "updated_after": "updated_at__gt")
+        self.filter_fields = filter_fields or {}
+        # 🔥 Campos aceitos em `?ordering=` (com `-` para decrescente); devem ser não nulos
+        self.ordering_fields = ordering_fields or ["created_at"]
+        # 🔥 Campos aceitos na criação/alteração (padrão: editáveis e legíveis). Declare explicitamente quando
+        # há campos legíveis que o cliente não pode alterar (ex: `is_superuser`) ou especiais (`password`)
+        self.writable_fields = {
+            field.name: field for field in model._meta.concrete_fields
+            if field.editable and not field.primary_key and (
+                field.name in writable_fields if writable_fields is not None else field.attname in self.readable_fields
+            )
+        }
+        # 🔥 Com `updated_at`, as leituras por id ganham `ETag`/`Last-Modified` e o PATCH aceita `If-Match`
+        self.versioned = any(field.name == "updated_at" for field in model._meta.concrete_fields)
+        # 🔥 Cache das leituras (opt-in): `cache_ttl` em segundos, sobrescrito por `CRUD_CACHE_TTL` nas settings
+        self.cache_ttl = settings.CRUD_CACHE_TTL.get(model._meta.label_lower, cache_ttl)
+        if self.cache_ttl:
+            crud_cache.register(model, self.cache_ttl)
+        self.warn_unindexed_fields()
+
+    def _field(self, lookup: str) -> models.Field:
+        return self.model._meta.get_field(lookup.split("__")[0])
+
+    def _is_indexed(self, name: str) -> bool:
+        """Existe índice cuja primeira coluna é `name`? (pk, unique, db_index, Meta.indexes, UniqueConstraint)"""
+        field = self.model._meta.get_field(name)
+        if field.primary_key or field.unique or field.db_index:
+            return True
+        leading = [index.fields[0].lstrip("-") for index in self.model._meta.indexes if index.fields]
+        leading += [
+            constraint.fields[0] for constraint in self.model._meta.constraints
+            if isinstance(constraint, models.UniqueConstraint) and constraint.fields
+        ]
+        return name in leading
+
+    def warn_unindexed_fields(self):
+        """Avisa na inicialização sobre filtros/ordenações sem índice (viram varredura da tabela inteira)"""
+        names = {self._field(lookup).name for lookup in self.filter_fields.values()} | set(self.ordering_fields)
+        for name in sorted(names):
+            if not self._is_indexed(name):
+                logger.warning(f"⚠️ {self.model.__name__}.{name} é filtro/ordenação da API, mas não tem índice no banco")
 
     def get_all(self) -> List[ModelType]:  # 🔥 Remove `db`, usa Django ORM diretamente
         return list(self.model.objects.all())
 
+    def parse_fields(self, fields: Optional[str]) -> Optional[List[str]]:
+        """Valida o `?fields=a,b` contra `readable_fields`. `None` quando não informado"""
+        if not fields:
+            return None
+        selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+        invalid = [field for field in selected if field not in self.readable_fields]
+        if invalid or not selected:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos inválidos: {', '.join(invalid)}. Permitidos: {', '.join(self.readable_fields)}",
+            )
+        return selected
+
+    def parse_filters(self, params: Mapping[str, str]) -> Q:
+        """Monta o filtro a partir dos parâmetros declarados em `filter_fields` (os demais são ignorados)"""
+        filters = Q()
+        for param, lookup in self.filter_fields.items():
+            if param in params:
+                filters &= Q(**{lookup: to_python(self._field(lookup), params[param])})
+        return filters
+
+    def parse_ordering(self, ordering: Optional[str]) -> str:
+        ordering = ordering or "created_at"
+        if ordering.lstrip("-") not in self.ordering_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ordenação inválida: {ordering}. Permitidas: {', '.join(self.ordering_fields)}",
+            )
+        return ordering
+
+    def _page_queryset(
+        self,
+        cursor: Optional[str],
+        fields: Optional[List[str]],
+        filters: Optional[Q],
+        ordering: str,
+    ):
+        """Queryset da página ordenada por `(ordering, id)` a partir do cursor (sem o `LIMIT`)"""
+        name = ordering.lstrip("-")
+        descending = ordering.startswith("-")
+        prefix = "-" if descending else ""
+        queryset = self.model.objects.filter(filters or Q()).order_by(ordering, f"{prefix}id")
+        if fields:
+            queryset = queryset.values(*dict.fromkeys([*fields, name, "id"]))  # 🔥 Colunas do cursor
+
+        if cursor:
+            cursor_ordering, value, id = decode_cursor(cursor)
+            if cursor_ordering != ordering:
+                raise HTTPException(status_code=400, detail="Cursor gerado com outra ordenação")
+            try:  # 🔥 Cursor adulterado (ex: id que não é UUID) é erro do cliente, não 500
+                value = self.model._meta.get_field(name).to_python(value)
+                id = self.model._meta.pk.to_python(id)
+            except (ValidationError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Cursor inválido")
+            # 🔥 `campo >= x` delimita o range do índice; o `OR` só desempata os iguais pelo id
+            op = "lt" if descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{name}__{op}e": value}) & (Q(**{f"{name}__{op}": value}) | Q(**{f"id__{op}": id}))
+            )
+        return queryset
+
+    def _page_result(
+        self, items: list, limit: int, fields: Optional[List[str]], ordering: str
+    ) -> Tuple[list, Optional[str]]:
+        """Corta os `limit + 1` itens lidos na página e monta o cursor da próxima"""
+        name = ordering.lstrip("-")
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            if fields:
+                next_cursor = encode_cursor(ordering, last[name], last["id"])
+            else:
+                next_cursor = encode_cursor(ordering, getattr(last, name), last.id)
+
+        if fields:
+            items = [{field: row[field] for field in fields} for row in items]
+        return items, next_cursor
+
+    def get_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[Q] = None,
+        ordering: str = "created_at",
+    ) -> Tuple[list, Optional[str]]:
+        """
+        Página ordenada por `(ordering, id)` a partir do cursor (keyset), usando o índice do campo ordenado.
+        O custo não depende da posição na tabela, ao contrário de `OFFSET`. Retorna `(itens, próximo_cursor)`.
+        Com `fields`, seleciona só essas colunas e retorna dicts (`.values()`), sem instanciar o modelo.
+        """
+        queryset = self._page_queryset(cursor, fields, filters, ordering)
+        items = list(queryset[:limit + 1])  # 🔥 Um a mais para saber se existe próxima página
+        return self._page_result(items, limit, fields, ordering)
+
+    async def stream_ndjson(
+        self, chunk_size: int, fields: Optional[List[str]] = None, filters: Optional[Q] = None, buffer_size: int = 64 * 1024
+    ):
+        """
+        Exporta todos os registros como NDJSON (uma linha JSON por registro), em ordem `(created_at, id)`.
+        Lê com cursor do lado do servidor em blocos de `chunk_size` (`aiterator`) e sem instanciar modelos,
+        então a memória fica constante independentemente do tamanho da tabela.
+        """
+        queryset = (
+            self.model.objects.filter(filters or Q())
+            .order_by("created_at", "id")
+            .values(*(fields or self.readable_fields))
+        )
+        buffer = bytearray()
+        async for row in queryset.aiterator(chunk_size=chunk_size):
+            buffer += orjson.dumps(row)
+            buffer += b"\n"
+            if len(buffer) >= buffer_size:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
     def get(self, id: str) -> ModelType:
         obj = self.model.objects.filter(id=id).first()
         if not obj:
             raise HTTPException(status_code=404, detail="Objeto não encontrado")
         return obj
 
+    def get_values(self, id: str, fields: List[str]) -> dict:
+        """Só as colunas pedidas de um registro, sem instanciar o modelo"""
+        row = self.model.objects.filter(id=id).values(*fields).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Objeto não encontrado")
+        return row
+
+    def get_version(self, id: str):
+        """Só o `updated_at` do registro: consulta estreita para responder requisições condicionais"""
+        updated_at = self.model.objects.filter(id=id).values_list("updated_at", flat=True).first()
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Objeto não encontrado")
+        return updated_at
+
     def update(self, id: str, update_data: dict) -> ModelType:
         obj = self.get(id)
         for key, value in update_data.items():
@@ -24,7 +250,285 @@ class CRUDBase(Generic[ModelType]):
         obj.save()  # 🔥 Agora usa `.save()` do Django ORM
         return obj
 
+    def _parse_ids(self, ids: List[str]) -> list:
+        return list(dict.fromkeys(to_python(self.model._meta.pk, id) for id in ids))
+
+    def _bulk_history(self, ids: list, history_user, change_reason: str):
+        """Histórico dos registros alterados em lote: um SELECT e um `bulk_create` no modelo histórico"""
+        if not hasattr(self.model, "history"):
+            return
+        objs = list(self.model.all_objects.filter(id__in=ids))
+        self.model.history.bulk_history_create(
+            objs, update=True, default_user=history_user, default_change_reason=change_reason
+        )
+
+    def bulk_update(self, ids: List[str], changes: dict, history_user=None, change_reason: str = "") -> int:
+        """
+        Aplica as mesmas alterações a vários registros com um único `UPDATE ... WHERE id IN (...)`,
+        grava o histórico em lote e envia `rows_changed` — tudo em uma transação. Retorna a quantidade alterada.
+        Campos únicos (ex: `username`) não são aceitos: o mesmo valor em vários registros sempre conflitaria.
+        """
+        invalid = [name for name in changes if name not in self.writable_fields]
+        if invalid or not changes:
+            raise HTTPException(status_code=400, detail=f"Campos inválidos para alteração: {', '.join(invalid)}")
+        unique = [name for name in changes if self.writable_fields[name].unique]
+        if unique:
+            raise HTTPException(status_code=400, detail=f"Campos únicos não podem ser alterados em lote: {', '.join(unique)}")
+        values = {name: to_python(self.writable_fields[name], value) for name, value in changes.items()}
+        if self.versioned:
+            values["updated_at"] = now()  # 🔥 `update()` não aplica o `auto_now`
+
+        ids = self._parse_ids(ids)
+        try:
+            with transaction.atomic():
+                changed = list(self.model.objects.filter(id__in=ids).values_list("id", flat=True))
+                count = self.model.objects.filter(id__in=changed).update(**values)
+                self._bulk_history(changed, history_user, change_reason)
+                transaction.on_commit(lambda: rows_changed.send(sender=self.model, ids=changed))
+        except IntegrityError:  # 🔥 Ex: UniqueConstraint composta com os valores novos
+            raise HTTPException(status_code=409, detail="Alteração conflita com registros existentes")
+        return count
+
+    def bulk_delete(self, ids: List[str], history_user=None, change_reason: str = "") -> int:
+        """Soft delete em lote (mesma semântica do `BaseModel.delete`: só preenche `deleted_at`)"""
+        ids = self._parse_ids(ids)
+        with transaction.atomic():
+            changed = list(self.model.objects.filter(id__in=ids).values_list("id", flat=True))
+            count = self.model.all_objects.filter(id__in=changed).update(deleted_at=now())
+            self._bulk_history(changed, history_user, change_reason)
+            transaction.on_commit(lambda: rows_changed.send(sender=self.model, ids=changed))
+        return count
+
+    def build(self, data: dict) -> ModelType:
+        """Instância nova (ainda não salva) a partir dos dados recebidos. Subclasses tratam campos especiais"""
+        invalid = [name for name in data if name not in self.writable_fields]
+        if invalid:
+            raise ValidationError({name: "Campo não permitido" for name in invalid})
+        return self.model(**data)
+
+    def validate(self, data: dict) -> ModelType:
+        """Monta e valida a instância (sem checar unicidade, que custaria uma query por registro)"""
+        obj = self.build(data)
+        obj.full_clean(validate_unique=False, validate_constraints=False)
+        return obj
+
+    def readable_values(self, obj) -> dict:
+        return {field: getattr(obj, field) for field in self.readable_fields}
+
+    def create(self, data: dict, history_user=None, change_reason: str = "") -> dict:
+        try:
+            obj = self.validate(data)
+            obj.validate_unique()
+        except ValidationError as exc:
+            raise HTTPException(status_code=400, detail=exc.message_dict)
+        obj._history_user = history_user
+        obj._change_reason = change_reason
+        obj.save()
+        return self.readable_values(obj)
+
+    def _unique_conflicts(self, objs: list) -> dict:
+        """Posição -> erro para valores únicos já existentes no banco (uma query por campo) ou repetidos no lote"""
+        conflicts = {}
+        for field in self.model._meta.concrete_fields:
+            if not field.unique or field.primary_key:
+                continue
+            values = [getattr(obj, field.attname) for obj in objs]
+            existing = set(self.model.all_objects.filter(**{f"{field.attname}__in": values}).values_list(field.attname, flat=True))
+            seen = set()
+            for position, value in enumerate(values):
+                if value in existing or value in seen:
+                    conflicts.setdefault(position, {})[field.name] = ["Já existe um registro com este valor"]
+                seen.add(value)
+        return conflicts
+
+    def _insert_batch(self, rows, history_user, change_reason: str) -> Tuple[int, list]:
+        """Valida e insere com `bulk_create` + histórico em lote. `rows`: iterável de `(linha, dict)`"""
+        objs, lines, errors = [], [], []
+        for line, data in rows:
+            try:
+                objs.append(self.validate(data))
+                lines.append(line)
+            except ValidationError as exc:
+                errors.append({"linha": line, "erros": exc.message_dict})
+
+        conflicts = self._unique_conflicts(objs)
+        errors += [{"linha": lines[position], "erros": error} for position, error in conflicts.items()]
+        objs = [obj for position, obj in enumerate(objs) if position not in conflicts]
+
+        with transaction.atomic():
+            self.model.objects.bulk_create(objs, batch_size=1000)
+            if hasattr(self.model, "history"):
+                self.model.history.bulk_history_create(objs, default_user=history_user, default_change_reason=change_reason)
+            ids = [obj.pk for obj in objs]
+            transaction.on_commit(lambda: rows_changed.send(sender=self.model, ids=ids))
+        return len(objs), sorted(errors, key=lambda error: error["linha"])
+
+    def bulk_create(self, rows: List[dict], history_user=None, change_reason: str = "") -> dict:
+        """Cria vários registros; linhas inválidas ou duplicadas são reportadas e as demais inseridas"""
+        created, errors = self._insert_batch(enumerate(rows, start=1), history_user, change_reason)
+        return {"total": len(rows), "criados": created, "erros": errors}
+
+    def import_file(self, file, fmt: str, history_user=None, change_reason: str = "", max_errors: int = 1000) -> dict:
+        """
+        Importa um CSV/JSONL grande. No PostgreSQL, as linhas válidas são enviadas via `COPY` para uma
+        tabela temporária e mescladas com `INSERT ... ON CONFLICT DO NOTHING` (conflitos viram erro da linha).
+        Erros de validação são reportados por linha (até `max_errors`).
+        """
+        total = 0
+        errors = []
+
+        def nullable(data: dict) -> dict:
+            # 🔥 No CSV não existe NULL: vazio em campo anulável vira None
+            return {
+                key: None if value == "" and key in self.writable_fields and self.writable_fields[key].null else value
+                for key, value in data.items()
+            }
+
+        def valid_rows():
+            nonlocal total
+            for line, data in read_rows(file, fmt):
+                total += 1
+                if data is None:
+                    errors.append({"linha": line, "erros": {"__all__": ["JSON inválido"]}})
+                    continue
+                data = nullable(data) if fmt == "csv" else data
+                if connection.vendor != "postgresql":
+                    yield line, data
+                    continue
+                try:
+                    yield line, self.validate(data)
+                except ValidationError as exc:
+                    errors.append({"linha": line, "erros": exc.message_dict})
+
+        if connection.vendor != "postgresql":  # 🔥 Sem COPY (ex: SQLite nos testes): mesmo caminho do bulk POST
+            created, batch_errors = self._insert_batch(valid_rows(), history_user, change_reason)
+            errors += batch_errors
+        else:
+            with transaction.atomic():
+                ids, conflicts = copy_insert(self.model, valid_rows(), history_user, change_reason)
+                transaction.on_commit(lambda: rows_changed.send(sender=self.model, ids=ids))
+            created = len(ids)
+            errors += [{"linha": line, "erros": {"__all__": ["Registro duplicado (chave única já existe)"]}} for line in conflicts]
+
+        errors.sort(key=lambda error: error["linha"])
+        return {"total": total, "criados": created, "total_erros": len(errors), "erros": errors[:max_errors]}
+
     def delete(self, id: str):
         obj = self.get(id)
         obj.delete()  # 🔥 Agora usa `.delete()` do Django ORM
         return {"message": "Objeto deletado com sucesso"}
+
+
+class AsyncCRUDBase(CRUDBase[ModelType]):
+    """
+    Variante async do CRUD para rotas `async def`: as leituras não ocupam uma vaga do threadpool do Starlette.
+    O queryset é montado no event loop e só a ida ao banco roda no pool dedicado (`db_sync_to_async`),
+    já que os métodos async do ORM (`afirst`, `asave`...) usam o `thread_sensitive=True`, uma thread por processo.
+    Criação, lote e importação continuam síncronas (usam `transaction.atomic`, que não tem versão async).
+    Com `cache_ttl`, leituras por id e páginas passam pelo `crud_cache` e voltam como dicts dos `readable_fields`.
+    """
+
+    async def aget_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[Q] = None,
+        ordering: str = "created_at",
+    ) -> Tuple[list, Optional[str]]:
+        """Mesmo que `get_page`, lendo a página no pool do banco (ou do cache)"""
+        if self.cache_ttl:
+            fields = fields or self.readable_fields
+            generation = crud_cache.generation(self.model)
+            key = (generation, limit, cursor, tuple(fields), str(filters or Q()), ordering)
+            page = crud_cache.get(self.model, "page", key)
+            if page is not None:
+                return page
+
+        queryset = self._page_queryset(cursor, fields, filters, ordering)
+        items = await db_sync_to_async(list)(queryset[:limit + 1])
+        page = self._page_result(items, limit, fields, ordering)
+        if self.cache_ttl:
+            crud_cache.set(self.model, "page", key, page, generation)
+        return page
+
+    async def aget_row(self, id: str) -> dict:
+        """Registro com os `readable_fields` (e `updated_at`) pelo cache; no miss, uma consulta com `.values()`"""
+        key = str(to_python(self.model._meta.pk, id))  # 🔥 Mesmo formato do id recebido na invalidação
+        row = crud_cache.get(self.model, "object", key)
+        if row is None:
+            generation = crud_cache.generation(self.model, key)
+            fields = [*self.readable_fields, "updated_at"] if self.versioned else self.readable_fields
+            row = await db_sync_to_async(self.model.objects.filter(id=key).values(*dict.fromkeys(fields)).first)()
+            if not row:
+                raise HTTPException(status_code=404, detail="Objeto não encontrado")
+            crud_cache.set(self.model, "object", key, row, generation)
+        return row
+
+    async def aget(self, id: str) -> ModelType:
+        obj = await db_sync_to_async(self.model.objects.filter(id=id).first)()
+        if not obj:
+            raise HTTPException(status_code=404, detail="Objeto não encontrado")
+        return obj
+
+    async def aget_values(self, id: str, fields: List[str]) -> dict:
+        if self.cache_ttl:
+            row = await self.aget_row(id)
+            return {field: row[field] for field in fields}
+        row = await db_sync_to_async(self.model.objects.filter(id=id).values(*fields).first)()
+        if not row:
+            raise HTTPException(status_code=404, detail="Objeto não encontrado")
+        return row
+
+    async def aget_version(self, id: str):
+        if self.cache_ttl:
+            return (await self.aget_row(id))["updated_at"]  # 🔥 No miss, já deixa o registro no cache para o GET
+        return await db_sync_to_async(self.get_version)(id)
+
+    async def aupdate(
+        self, id: str, update_data: dict, history_user=None, change_reason: str = "", if_match: Optional[str] = None
+    ) -> ModelType:
+        """
+        Atualiza os campos e salva; `history_user`/`change_reason` vão direto para o histórico.
+        Com `if_match` (cabeçalho `If-Match`), só salva se o registro ainda estiver nessa versão (senão 412).
+        Só os `writable_fields` podem ser alterados (senão 400); valor único já usado por outro registro é 409.
+        """
+        invalid = [name for name in update_data if name not in self.writable_fields]
+
+        def update():
+            try:
+                with transaction.atomic():
+                    queryset = self.model.objects.filter(id=id)
+                    if if_match is not None and self.versioned:
+                        queryset = queryset.select_for_update()  # 🔥 Ninguém altera entre a comparação e o save
+                    obj = queryset.first()
+                    if not obj:
+                        raise HTTPException(status_code=404, detail="Objeto não encontrado")
+                    if invalid:
+                        raise HTTPException(status_code=400, detail=f"Campos inválidos para alteração: {', '.join(invalid)}")
+                    if if_match is not None and self.versioned and not etag_matches(if_match, obj.updated_at):
+                        raise HTTPException(status_code=412, detail="O registro foi alterado desde a última leitura")
+                    for key, value in update_data.items():
+                        setattr(obj, key, value)
+                    obj._history_user = history_user
+                    obj._change_reason = change_reason or None
+                    obj.save()
+            except IntegrityError:  # 🔥 Ex: `username` já usado por outro registro
+                raise HTTPException(status_code=409, detail="Alteração conflita com registros existentes")
+            return obj
+
+        return await db_sync_to_async(update)()
+
+    async def adelete(self, id: str, history_user=None, change_reason: str = ""):
+        """Soft delete; salva antes para o histórico registrar quem removeu"""
+        obj = await self.aget(id)
+
+        def delete_with_history():
+            if change_reason:
+                obj._history_user = history_user
+                obj._change_reason = change_reason
+                obj.save()
+            obj.delete()
+
+        await db_sync_to_async(delete_with_history)()
+        return {"message": "Objeto deletado com sucesso"}
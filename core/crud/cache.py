@@ -0,0 +1,78 @@
+import orjson
+from django.conf import settings
+from prometheus_client import Counter, Gauge
+
+from core.cache import TTLCache
+from core.generations import generations
+
+# 🔥 Métricas do cache de leituras (expostas em /metrics pelo Instrumentator)
+CRUD_CACHE_HITS = Counter("nsgates_crud_cache_hits_total", "Leituras do CRUD servidas pelo cache", ["model", "kind"])
+CRUD_CACHE_MISSES = Counter("nsgates_crud_cache_misses_total", "Leituras do CRUD que foram ao banco", ["model", "kind"])
+CRUD_CACHE_ENTRIES = Gauge("nsgates_crud_cache_entries", "Entradas no cache de leituras do CRUD")
+CRUD_CACHE_BYTES = Gauge("nsgates_crud_cache_bytes", "Tamanho aproximado (JSON) das entradas no cache de leituras do CRUD")
+
+
+class CRUDCache:
+    """
+    Cache read-through das leituras dos CRUDs (registro por id e páginas da listagem), compartilhado por
+    todos os modelos: LRU com limite de entradas e de bytes, e TTL definido por modelo.
+
+    Cada entrada guarda a geração lida antes da consulta ao banco, em `SharedGenerations`: a do registro
+    (por id) ou a do modelo (páginas). Uma alteração incrementa as duas e, em qualquer worker da máquina,
+    a entrada deixa de valer na próxima leitura (inclusive a versão usada no `ETag`/304).
+    A geração também impede que uma leitura iniciada antes de uma alteração grave o valor antigo.
+    Em outras máquinas, alterações só aparecem após o TTL do modelo.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int, shared=None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=0, max_bytes=max_bytes)
+        self.shared = shared or generations
+        self.ttls = {}  # 🔥 label do modelo -> TTL (só modelos com cache habilitado)
+
+    def register(self, model, ttl: float):
+        self.ttls[model._meta.label_lower] = ttl
+
+    def is_tracked(self, model) -> bool:
+        return model._meta.label_lower in self.ttls
+
+    def generation(self, model, id: str = None) -> int:
+        """Geração do registro `id` ou, sem ele, do modelo; leia antes da consulta e passe para o `set`"""
+        return self.shared.get(f"crud:{model._meta.label_lower}", id)
+
+    def get(self, model, kind: str, key):
+        label = model._meta.label_lower
+        item = self.cache.get((label, kind, key))
+        value = None
+        if item is not None:
+            generation, value = item
+            if generation != self.generation(model, key if kind == "object" else None):
+                self.cache.delete((label, kind, key))  # 🔥 Alterado (talvez em outro worker) depois da leitura
+                value = None
+        (CRUD_CACHE_MISSES if value is None else CRUD_CACHE_HITS).labels(label, kind).inc()
+        return value
+
+    def set(self, model, kind: str, key, value, generation: int):
+        """Grava só se nada mudou desde `generation` (lida antes da consulta ao banco)"""
+        label = model._meta.label_lower
+        if self.generation(model, key if kind == "object" else None) != generation:
+            return
+        size = len(orjson.dumps(value, default=str))
+        self.cache.set((label, kind, key), (generation, value), ttl=self.ttls[label], size=size)
+
+    def invalidate(self, model, *ids):
+        """Registro(s) alterado(s): invalida os ids e as páginas do modelo em todos os workers da máquina"""
+        label = model._meta.label_lower
+        if label not in self.ttls:
+            return
+        self.shared.bump(f"crud:{label}")
+        for id in ids:
+            self.shared.bump(f"crud:{label}", str(id))
+            self.cache.delete((label, "object", str(id)))
+
+    def clear(self):
+        self.cache.clear()
+
+
+crud_cache = CRUDCache(maxsize=settings.CRUD_CACHE_MAX_SIZE, max_bytes=settings.CRUD_CACHE_MAX_BYTES)
+CRUD_CACHE_ENTRIES.set_function(lambda: len(crud_cache.cache))
+CRUD_CACHE_BYTES.set_function(lambda: crud_cache.cache.bytes)
@@ -0,0 +1,106 @@
+import codecs
+import csv
+import tempfile
+from datetime import date, datetime, time
+
+import orjson
+from django.db import connection
+
+# 🔥 Linhas válidas vão para um arquivo temporário (em memória até 8 MiB) antes do COPY
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def read_rows(file, fmt: str):
+    """
+    Lê o upload linha a linha como `(número_da_linha, dict)`, sem carregar o arquivo inteiro.
+    `fmt`: "csv" (com cabeçalho) ou "jsonl". Linhas JSON inválidas viram `(linha, None)`.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(codecs.iterdecode(file, "utf-8-sig"))
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key is not None}
+        return
+
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _copy_value(value) -> str:
+    """Valor no formato texto do COPY (`\\N` para NULL, com escape de `\\`, tab e quebras de linha)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date, time)):
+        value = value.isoformat()
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def copy_insert(model, objs, history_user=None, change_reason: str = ""):
+    """
+    Insere as instâncias (já validadas, em um iterável de `(linha, obj)`) via PostgreSQL:
+    `COPY` para uma tabela temporária e um único `INSERT ... SELECT ... ON CONFLICT DO NOTHING`
+    que também grava o histórico inicial (`+`). Deve rodar dentro de uma transação.
+    Retorna `(ids_inseridos, linhas_em_conflito)`.
+    """
+    quote = connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    columns = [field.column for field in fields]
+    column_list = ", ".join(quote(column) for column in columns)
+    table = quote(model._meta.db_table)
+    staging = quote(f"import_{model._meta.db_table}")
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+", encoding="utf-8")
+    for line_number, obj in objs:
+        values = [field.pre_save(obj, add=True) for field in fields]  # 🔥 Aplica `auto_now_add` / `auto_now`
+        buffer.write("\t".join(_copy_value(value) for value in values) + f"\t{line_number}\n")
+    buffer.seek(0)
+
+    history = getattr(model, "history", None)
+    history_sql = ""
+    history_params = []
+    if history is not None:
+        historical = history.model
+        tracked = ", ".join(quote(field.column) for field in historical.tracked_fields)
+        history_sql = f"""
+            , history AS (
+                INSERT INTO {quote(historical._meta.db_table)}
+                    ({tracked}, history_date, history_type, history_change_reason, history_user_id)
+                SELECT {", ".join(f"s.{quote(field.column)}" for field in historical.tracked_fields)},
+                       now(), '+', %s, %s
+                FROM {staging} s JOIN inserted USING (id)
+            )"""
+        history_params = [change_reason or None, getattr(history_user, "pk", None)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        cursor.execute(f"ALTER TABLE {staging} ADD COLUMN _line integer")
+        cursor.copy_expert(f"COPY {staging} ({column_list}, _line) FROM STDIN", buffer)
+        cursor.execute(
+            f"""
+            WITH inserted AS (
+                INSERT INTO {table} ({column_list})
+                SELECT {column_list} FROM {staging}
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            ){history_sql}
+            SELECT s.id, s._line, inserted.id IS NOT NULL
+            FROM {staging} s LEFT JOIN inserted USING (id)
+            ORDER BY s._line
+            """,
+            history_params,
+        )
+        results = cursor.fetchall()
+        cursor.execute(f"DROP TABLE {staging}")  # 🔥 Permite outra importação na mesma transação
+
+    inserted_ids = [id for id, _, inserted in results if inserted]
+    conflicts = [line_number for _, line_number, inserted in results if not inserted]
+    return inserted_ids, conflicts
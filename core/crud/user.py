@@ -1,4 +1,35 @@
 from core.models.user import CustomUser
-from core.crud.base import CRUDBase
+from core.crud.base import AsyncCRUDBase
 
-user_crud = CRUDBase(CustomUser)
+
+class UserCRUD(AsyncCRUDBase[CustomUser]):
+    """CRUD de usuários: a senha só entra na criação e sempre passa pelo `set_password`"""
+
+    def build(self, data: dict) -> CustomUser:
+        data = dict(data)
+        password = data.pop("password", None)
+        user = super().build(data)
+        if password:
+            user.set_password(password)
+        else:
+            user.set_unusable_password()
+        return user
+
+
+user_crud = UserCRUD(
+    CustomUser,
+    readable_fields=[
+        "id", "username", "email", "first_name", "last_name", "is_active", "is_staff", "is_superuser",
+        "last_login", "date_joined", "created_at", "updated_at", "deleted_at",
+    ],  # 🔥 Nunca expor o hash da senha
+    # 🔥 Permissões, datas e soft delete não são alterados pela API; `password` é tratado no `build`
+    writable_fields=["username", "email", "first_name", "last_name", "is_active"],
+    filter_fields={
+        "username": "username",
+        "email": "email",
+        "is_active": "is_active",
+        "updated_after": "updated_at__gt",
+        "updated_before": "updated_at__lt",
+    },
+    ordering_fields=["created_at", "updated_at", "username"],
+)
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from prometheus_client import Gauge
+
+# 🔥 Métricas de saturação do pool (expostas em /metrics pelo Instrumentator)
+DB_EXECUTOR_QUEUE_DEPTH = Gauge(
+    "nsgates_db_executor_queue_depth",
+    "Chamadas ao banco aguardando uma thread livre do pool",
+)
+DB_EXECUTOR_ACTIVE = Gauge(
+    "nsgates_db_executor_active",
+    "Chamadas ao banco em execução nas threads do pool",
+)
+DB_EXECUTOR_WORKERS = Gauge(
+    "nsgates_db_executor_workers",
+    "Tamanho do pool de threads do banco",
+)
+
+def _persistent_connections():
+    """
+    Só as threads do pool mantêm conexões persistentes (`DB_EXECUTOR_CONN_MAX_AGE`); o resto do processo
+    segue o `CONN_MAX_AGE` das settings. As conexões do Django são por thread, mas o `settings_dict`
+    é compartilhado, então cada thread recebe uma cópia.
+    """
+    for connection in connections.all():
+        connection.settings_dict = {**connection.settings_dict, "CONN_MAX_AGE": settings.DB_EXECUTOR_CONN_MAX_AGE}
+
+
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix="db", initializer=_persistent_connections
+)
+DB_EXECUTOR_QUEUE_DEPTH.set_function(lambda: db_executor._work_queue.qsize())
+DB_EXECUTOR_WORKERS.set(settings.DB_EXECUTOR_WORKERS)
+
+
+def db_sync_to_async(fn):
+    """
+    Como o `sync_to_async`, mas no pool dedicado ao banco em vez do `thread_sensitive=True`,
+    que serializa todo acesso ao ORM do processo em uma única thread.
+    Cada chamada é tratada como uma requisição do Django: ao final, conexões vencidas ou com erro
+    são fechadas (`close_old_connections`), respeitando o `CONN_MAX_AGE`. Uma só limpeza por chamada:
+    a próxima chamada na mesma thread já encontra a conexão verificada.
+    """
+    def run(*args, **kwargs):
+        with DB_EXECUTOR_ACTIVE.track_inprogress():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=db_executor)
@@ -0,0 +1,43 @@
+import hashlib
+import struct
+
+from django.conf import settings
+
+from core.shared_memory import HEADER, SharedTable, default_storage_path
+
+_SLOT = struct.Struct("<Q")
+_MAGIC = b"NSGGEN01"
+
+
+class SharedGenerations:
+    """
+    Contadores de geração compartilhados entre os workers da máquina via arquivo mapeado em memória (`/dev/shm`).
+    Um cache guarda a geração da chave junto com o valor e descarta a entrada se ela mudou:
+    invalidar em um worker (`bump`) vale na hora para todos, sem I/O de rede na leitura.
+    Cada `(namespace, chave)` cai em um slot de uma tabela fixa; colisões só causam misses extras.
+    Workers em outras máquinas não compartilham o arquivo e continuam limitados pelo TTL de cada cache.
+    """
+
+    def __init__(self, path: str = None, slots: int = 65536):
+        self.slots = slots
+        self._table = SharedTable(path, _MAGIC, slots, _SLOT.size)
+        self._buf = self._table.buf
+
+    def _offset(self, namespace: str, key) -> int:
+        digest = hashlib.blake2b(f"{namespace}\0{key}".encode("utf-8"), digest_size=8).digest()
+        return HEADER.size + (int.from_bytes(digest, "little") % self.slots) * _SLOT.size
+
+    def get(self, namespace: str, key=None) -> int:
+        return _SLOT.unpack_from(self._buf, self._offset(namespace, key))[0]
+
+    def bump(self, namespace: str, key=None):
+        """Invalida `(namespace, chave)`; sem chave, a geração do namespace inteiro"""
+        offset = self._offset(namespace, key)
+        with self._table.locked(offset, _SLOT.size):
+            _SLOT.pack_into(self._buf, offset, _SLOT.unpack_from(self._buf, offset)[0] + 1)
+
+
+generations = SharedGenerations(
+    settings.CACHE_GENERATIONS_PATH or default_storage_path("nsgates-generations"),
+    slots=settings.CACHE_GENERATIONS_SLOTS,
+)
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from django.utils.timezone import now
+
+from core.cache import hash_credential
+from core.db_executor import db_sync_to_async
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidToken(Exception):
+    """Token JWT com assinatura, expiração ou formato inválido, ou revogado"""
+
+
+def is_jwt(token: str) -> bool:
+    """Tokens opacos do oauth2_provider nunca têm pontos; JWTs têm exatamente dois"""
+    return token.count(".") == 2
+
+
+class KeySet:
+    """
+    Conjunto de chaves de assinatura mantido em cache.
+    O arquivo `JWT_KEYS_FILE` ({"active_kid": "...", "keys": {"kid": "segredo"}}) é relido quando muda,
+    permitindo rotação sem restart: publique a nova chave como ativa e mantenha a antiga até os tokens expirarem.
+    Sem arquivo, usa uma única chave derivada do `SECRET_KEY`.
+    Se o arquivo sumir ou estiver inválido (ex: rotação pela metade), mantém as últimas chaves válidas e loga o erro.
+    """
+
+    def __init__(self, path: str = None, reload_interval: float = 60):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._keys = {}
+        self._active_kid = None
+        self._mtime = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.reload_interval:
+            return
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+
+            if not self.path:
+                if not self._keys:
+                    secret = hmac.new(settings.SECRET_KEY.encode(), b"nsgates-jwt-access-token", hashlib.sha256)
+                    self._keys = {"default": secret.hexdigest()}
+                    self._active_kid = "default"
+                return
+
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime == self._mtime:
+                    return
+
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                keys = dict(data["keys"])
+                active_kid = data["active_kid"]
+                keys[active_kid]  # 🔥 A chave ativa precisa estar publicada
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.exception(f"Erro ao carregar as chaves JWT de {self.path}; mantendo as chaves anteriores")
+                return
+
+            self._keys = keys
+            self._active_kid = active_kid
+            self._mtime = mtime
+            logger.info(f"🔑 Chaves JWT carregadas: {sorted(self._keys)} (ativa: {self._active_kid})")
+
+    def signing_key(self):
+        """Retorna `(kid, chave)` usados para assinar novos tokens"""
+        self._load()
+        if self._active_kid is None:
+            raise RuntimeError(f"Nenhuma chave JWT carregada de {self.path}")
+        return self._active_kid, self._keys[self._active_kid]
+
+    def verification_key(self, kid: str):
+        """Retorna a chave de um `kid` ainda publicado, ou None"""
+        self._load()
+        return self._keys.get(kid)
+
+
+class Denylist:
+    """
+    Lista compacta de tokens revogados: `jti` (checksum do AccessToken) -> expiração em epoch.
+    A verificação é só memória; `refresh()` sincroniza periodicamente com a tabela `RevokedToken`
+    para propagar revogações feitas em outros workers.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._watermark = None
+        self._lock = threading.Lock()
+
+    def add(self, jti: str, expires_at: float):
+        with self._lock:
+            self._entries[jti] = expires_at
+
+    def __contains__(self, jti: str) -> bool:
+        expires_at = self._entries.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def refresh(self):
+        """Carrega as revogações novas do banco e descarta as que já expiraram"""
+        from core.models import RevokedToken
+
+        RevokedToken.objects.filter(expires_at__lte=now()).delete()
+
+        queryset = RevokedToken.objects.filter(expires_at__gt=now())
+        if self._watermark is not None:
+            queryset = queryset.filter(created_at__gte=self._watermark)
+
+        for jti, expires_at, created_at in queryset.values_list("jti", "expires_at", "created_at"):
+            self.add(jti, expires_at.timestamp())
+            if self._watermark is None or created_at > self._watermark:
+                self._watermark = created_at
+
+        current_time = time.time()
+        with self._lock:
+            self._entries = {jti: exp for jti, exp in self._entries.items() if exp > current_time}
+
+    async def run_refresher(self, interval: float):
+        """Loop de sincronização executado em background no lifespan do FastAPI"""
+        while True:
+            try:
+                await db_sync_to_async(self.refresh)()
+            except Exception:
+                logger.exception("Erro ao sincronizar a denylist de tokens JWT")
+            await asyncio.sleep(interval)
+
+
+keyset = KeySet(settings.JWT_KEYS_FILE, settings.JWT_KEYS_RELOAD_INTERVAL)
+denylist = Denylist()
+
+
+def encode_access_token(
+    opaque_token: str, user_id, username: str, permissions, scope: str, expires_in: int, client_id: str = None
+) -> str:
+    """
+    Gera o JWT de acesso com as permissões embutidas.
+    O `jti` é o checksum do token opaco emitido pelo Django, então revogar o `AccessToken` revoga o JWT.
+    """
+    kid, key = keyset.signing_key()
+    issued_at = int(time.time())
+    claims = {
+        "jti": hash_credential(opaque_token),
+        "sub": str(user_id),
+        "username": username,
+        "perms": sorted(permissions),
+        "scope": scope,
+        "client_id": client_id,
+        "iat": issued_at,
+        "exp": issued_at + int(expires_in),
+    }
+    return jwt.encode(claims, key, algorithm=settings.JWT_ALGORITHM, headers={"kid": kid})
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Valida assinatura, expiração e revogação só em memória.
+    Retorna o mesmo formato da introspecção OAuth2.
+    """
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = keyset.verification_key(kid)
+        if key is None:
+            raise InvalidToken(f"Chave de assinatura desconhecida: {kid}")
+        claims = jwt.decode(
+            token, key, algorithms=[settings.JWT_ALGORITHM], options={"require": ["exp", "jti", "sub"]}
+        )
+    except jwt.PyJWTError as exc:
+        raise InvalidToken(str(exc)) from exc
+
+    if claims["jti"] in denylist:
+        raise InvalidToken("Token revogado")
+
+    return {
+        "active": True,
+        "scope": claims.get("scope", ""),
+        "exp": claims["exp"],
+        "client_id": claims.get("client_id"),
+        "username": claims.get("username"),
+        "user_id": claims["sub"],
+        "permissions": frozenset(claims.get("perms", ())),
+    }
@@ -0,0 +1,75 @@
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.db import migrations, models
+
+PREFIX_LENGTH = 12
+
+
+def hash_legacy_keys(apps, schema_editor):
+    """
+    Converte as chaves antigas (salvas em texto puro) para prefixo + HMAC.
+    Elas continuam válidas: o prefixo são os primeiros caracteres e o segredo é a chave inteira.
+    """
+    def hash_secret(secret):
+        return hmac.new(settings.APIKEY_HASH_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+    for model_name in ("APIKey", "HistoricalAPIKey"):
+        model = apps.get_model("core", model_name)
+        for row in model._base_manager.exclude(key="").only("pk", "key").iterator():
+            model._base_manager.filter(pk=row.pk).update(
+                prefix=row.key[:PREFIX_LENGTH], key_hash=hash_secret(row.key)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(default='', editable=False, max_length=64, verbose_name='Hash da chave'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='apikey',
+            name='prefix',
+            field=models.CharField(editable=False, max_length=12, null=True, verbose_name='Prefixo'),
+        ),
+        migrations.AddField(
+            model_name='historicalapikey',
+            name='key_hash',
+            field=models.CharField(default='', editable=False, max_length=64, verbose_name='Hash da chave'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='historicalapikey',
+            name='prefix',
+            field=models.CharField(db_index=True, editable=False, max_length=12, null=True, verbose_name='Prefixo'),
+        ),
+        migrations.RunPython(hash_legacy_keys, elidable=True),
+        migrations.AlterField(
+            model_name='apikey',
+            name='prefix',
+            field=models.CharField(editable=False, max_length=12, unique=True, verbose_name='Prefixo'),
+        ),
+        migrations.AlterField(
+            model_name='historicalapikey',
+            name='prefix',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=12, verbose_name='Prefixo'),
+            preserve_default=False,
+        ),
+        migrations.RemoveField(
+            model_name='apikey',
+            name='key',
+        ),
+        migrations.RemoveField(
+            model_name='historicalapikey',
+            name='key',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_apikey_prefix_key_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='rate_limit_tier',
+            field=models.CharField(default='apikey', help_text='Nome do plano definido em RATE_LIMIT_TIERS.', max_length=50, verbose_name='Plano de rate limit'),
+        ),
+        migrations.AddField(
+            model_name='historicalapikey',
+            name='rate_limit_tier',
+            field=models.CharField(default='apikey', help_text='Nome do plano definido em RATE_LIMIT_TIERS.', max_length=50, verbose_name='Plano de rate limit'),
+        ),
+    ]
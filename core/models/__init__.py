@@ -1,4 +1,5 @@
 from .base import BaseModel
 from .managers import CustomUserManager
 from .user import CustomUser
-from .apikey import APIKey
\ No newline at end of file
+from .apikey import APIKey
+from .revoked_token import RevokedToken
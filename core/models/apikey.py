@@ -1,6 +1,8 @@
 import hashlib
+import hmac
 import logging
 import secrets
+from django.conf import settings
 from django.db import models
 from django.utils.crypto import get_random_string
 from .base import BaseModel
@@ -10,18 +12,56 @@ from django.utils.translation import gettext_lazy as _
 logger = logging.getLogger(__name__)  # 🔥 Para debug no terminal
 
 class APIKey(BaseModel):
-    """Modelo para armazenar chaves de API seguras com Soft Delete e UUID"""
-    
+    """
+    Modelo para armazenar chaves de API seguras com Soft Delete e UUID.
+    A chave tem o formato `nsg_<prefixo>_<segredo>`: o prefixo é público e indexado (uma busca por chave),
+    e do segredo só guardamos um HMAC-SHA256. A chave completa é exibida apenas na criação.
+    """
+
+    KEY_SCHEME = "nsg"
+    PREFIX_LENGTH = 12
+
     name = models.CharField(_("Nome"), max_length=255, unique=True, help_text="Nome do serviço/sistema que usará a API Key.")
-    key = models.CharField(_("Chave de API"), max_length=64, unique=True, editable=False)
+    prefix = models.CharField(_("Prefixo"), max_length=PREFIX_LENGTH, unique=True, editable=False)
+    key_hash = models.CharField(_("Hash da chave"), max_length=64, editable=False)
     expires_at = models.DateTimeField(_("Expira em"), null=True, blank=True, help_text="Defina uma data de expiração opcional.")
     revoked = models.BooleanField(_("Revogado"), default=False, help_text="Se marcado, a API Key não será mais válida.")
+    rate_limit_tier = models.CharField(_("Plano de rate limit"), max_length=50, default="apikey", help_text="Nome do plano definido em RATE_LIMIT_TIERS.")
+
+    @classmethod
+    def split_key(cls, raw_key: str):
+        """
+        Separa a chave em `(prefixo, segredo)`.
+        Chaves antigas (sem o formato `nsg_`) usam os primeiros caracteres como prefixo e a chave inteira como segredo.
+        """
+        parts = raw_key.split("_", 2)
+        if len(parts) == 3 and parts[0] == cls.KEY_SCHEME and len(parts[1]) == cls.PREFIX_LENGTH:
+            return parts[1], parts[2]
+        return raw_key[:cls.PREFIX_LENGTH], raw_key
+
+    @staticmethod
+    def hash_secret(secret: str) -> str:
+        """HMAC-SHA256 do segredo: rápido o bastante para toda requisição e inútil sem o `APIKEY_HASH_KEY`"""
+        return hmac.new(settings.APIKEY_HASH_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+    def check_key(self, raw_key: str) -> bool:
+        """Confere a chave informada em tempo constante"""
+        prefix, secret = self.split_key(raw_key)
+        return prefix == self.prefix and hmac.compare_digest(self.hash_secret(secret), self.key_hash)
+
+    def generate_key(self) -> str:
+        """Gera uma nova chave, guarda apenas prefixo + hash e retorna a chave completa"""
+        self.prefix = secrets.token_hex(self.PREFIX_LENGTH // 2)
+        secret = secrets.token_urlsafe(32)
+        self.key_hash = self.hash_secret(secret)
+        self.raw_key = f"{self.KEY_SCHEME}_{self.prefix}_{secret}"  # 🔥 Não é salvo no banco
+        return self.raw_key
 
     def save(self, *args, **kwargs):
         """Gera uma chave segura apenas ao criar uma nova instância"""
-        if not self.key:
-            self.key = secrets.token_urlsafe(48)  # 🔥 Gera uma chave segura
-            logger.info(f"Nova API Key gerada: {self.key}")  # 🔥 Log para debug
+        if not self.prefix:
+            self.generate_key()
+            logger.info(f"Nova API Key gerada com prefixo: {self.prefix}")  # 🔥 Nunca loga o segredo
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1,11 +1,18 @@
 import uuid
 from django.db import models
+from django.dispatch import Signal
 from django.utils.timezone import now
 from simple_history.models import HistoricalRecords
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()  # 🔥 Isso precisa estar definido!
 
+# 🔥 Enviado no soft delete, que usa `.update()` e por isso não dispara `post_save`/`post_delete`
+soft_deleted = Signal()
+
+# 🔥 Enviado pelas operações em lote (`queryset.update()`), com `ids` dos registros alterados
+rows_changed = Signal()
+
 
 class ActiveManager(models.Manager):
     """Manager que retorna apenas registros não deletados"""
@@ -26,16 +33,19 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+        # 🔥 Índice da paginação por cursor (`ORDER BY created_at, id`)
+        indexes = [models.Index(fields=["created_at", "id"], name="%(app_label)s_%(class)s_keyset")]
 
     def delete(self, using=None, keep_parents=False):
         """Soft Delete"""
         self.__class__.all_objects.filter(id=self.id).update(deleted_at=now())
         self.refresh_from_db()
+        soft_deleted.send(sender=self.__class__, instance=self)
 
     def restore(self):
-        """Restaura um registro deletado"""
+        """Restaura um registro deletado (nova versão: `updated_at` muda e o `ETag` antigo deixa de casar)"""
         self.deleted_at = None
-        self.save(update_fields=["deleted_at"])
+        self.save(update_fields=["deleted_at", "updated_at"])
 
     @property
     def is_deleted(self):
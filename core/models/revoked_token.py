@@ -0,0 +1,13 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class RevokedToken(models.Model):
+    """Tokens JWT revogados antes de expirar, compartilhados entre os workers"""
+
+    jti = models.CharField(_("JTI"), max_length=64, unique=True)
+    expires_at = models.DateTimeField(_("Expira em"), db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -10,15 +10,24 @@ class CustomUser(AbstractUser, BaseModel):
     objects = CustomUserManager()  # Manager padrão
     all_objects = models.Manager()  # Para buscar usuários deletados também
 
+    class Meta(AbstractUser.Meta):
+        # 🔥 O Meta do AbstractUser tem precedência, então repetimos o do BaseModel
+        # e acrescentamos os índices dos filtros/ordenações da API (`core/crud/user.py`)
+        indexes = BaseModel.Meta.indexes + [
+            models.Index(fields=["email"], name="core_customuser_email"),
+            models.Index(fields=["is_active", "created_at", "id"], name="core_customuser_active"),
+            models.Index(fields=["updated_at", "id"], name="core_customuser_updated"),
+        ]
+
     def delete(self, using=None, keep_parents=False):
         """Soft Delete"""
         self.deleted_at = now()
         self.save(update_fields=["deleted_at"])
 
     def restore(self):
-        """Restaura um usuário deletado"""
+        """Restaura um usuário deletado (nova versão: `updated_at` muda e o `ETag` antigo deixa de casar)"""
         self.deleted_at = None
-        self.save(update_fields=["deleted_at"])
+        self.save(update_fields=["deleted_at", "updated_at"])
 
     @property
     def is_deleted(self):
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import transaction
+from django.db.models import OuterRef, Q
+
+from core.cache import SharedTTLCache
+from core.models.user import CustomUser
+
+
+def permission_codenames(user_ref: str = "pk"):
+    """
+    Subquery com os codenames das permissões diretas e de grupo do usuário referenciado por `user_ref`.
+    Permite trazer usuário e permissões em uma única query (`.annotate(...)`).
+    """
+    return ArraySubquery(
+        Permission.objects.filter(Q(user=OuterRef(user_ref)) | Q(group__user=OuterRef(user_ref)))
+        .order_by()  # 🔥 Remove a ordenação padrão (e o JOIN com content_type) do DISTINCT
+        .values("codename")
+        .distinct()
+    )
+
+
+class PermissionResolver:
+    """
+    Resolve as permissões (diretas + grupos) de um usuário como `frozenset`, com cache por username.
+    O cache é invalidado pelos signals em `core/signals.py` quando usuários, grupos ou permissões mudam;
+    via `SharedTTLCache`, a invalidação vale na hora para todos os workers da máquina.
+    Workers em outras máquinas enxergam a mudança em até `PERMISSION_CACHE_TTL` segundos.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.cache = SharedTTLCache("permissions", maxsize=maxsize, ttl=ttl)
+
+    def cached(self, username: str):
+        """Retorna `(user_id, permissoes)` do cache, sem tocar no banco"""
+        return self.cache.get(username)
+
+    def prime(self, username: str, user_id, codenames, generation=None, changes=None):
+        """
+        Guarda no cache permissões já carregadas por outra query (ex: validação do token no banco).
+        Passe a `generation` do username lida antes da query ou, se a query ainda não sabia o username,
+        o `cache.changes()` lido antes dela: houve qualquer invalidação no meio, nada é guardado.
+        """
+        entry = (user_id, frozenset(codenames or ()))
+        if changes is not None:
+            generation = self.cache.generation(username)
+            if self.cache.changes() != changes:
+                return entry
+        self.cache.set(username, entry, generation=generation)
+        return entry
+
+    def resolve(self, username: str):
+        """Retorna `(user_id, permissoes)` ou None se o usuário não existir. Uma única query no cache miss"""
+        entry = self.cached(username)
+        if entry is not None:
+            return entry
+
+        generation = self.cache.generation(username)  # 🔥 Antes da query: invalidação no meio não fica em cache
+        row = (
+            CustomUser.objects.filter(username=username)
+            .annotate(codenames=permission_codenames())
+            .values_list("pk", "codenames")
+            .first()
+        )
+        if row is None:
+            return None
+        return self.prime(username, *row, generation=generation)
+
+    def invalidate(self, username: str = None):
+        """
+        Invalida um usuário ou, sem argumento, o cache inteiro (mudanças em grupos/permissões).
+        Repete no commit: outro worker pode ter relido a versão antiga antes da transação terminar.
+        """
+        def invalidate():
+            if username is None:
+                self.cache.clear()
+            else:
+                self.cache.delete(username)
+
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+permission_resolver = PermissionResolver(
+    maxsize=settings.PERMISSION_CACHE_MAX_SIZE, ttl=settings.PERMISSION_CACHE_TTL
+)
@@ -1,23 +1,77 @@
-from fastapi import APIRouter
-from core.crud.base import CRUDBase
+from typing import Optional
+from django.conf import settings
+from fastapi import APIRouter, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from core.conditional import is_conditional, is_not_modified, validator_headers
+from core.crud.base import AsyncCRUDBase
 
 class RouterBase:
-    def __init__(self, model_crud: CRUDBase, prefix: str):
+    def __init__(self, model_crud: AsyncCRUDBase, prefix: str):
         self.model_crud = model_crud
         self.router = APIRouter(prefix=prefix)  # 🔥 Removemos a definição fixa de tags
 
+        # 🔥 Rotas `async def` com o ORM async: não dependem das vagas do threadpool do Starlette
         @self.router.get("/")
-        def get_all():
-            return self.model_crud.get_all()
+        async def get_all(
+            request: Request,
+            response: Response,
+            limit: int = Query(settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+            cursor: Optional[str] = None,
+            stream: bool = False,
+            fields: Optional[str] = None,
+            ordering: Optional[str] = None,
+        ):
+            """
+            Lista paginada por cursor; o cursor da próxima página vem no cabeçalho `X-Next-Cursor`.
+            Com `?stream=1` ou `Accept: application/x-ndjson`, exporta a tabela inteira em NDJSON via streaming.
+            `?fields=id,username` retorna só esses campos; sem ele, todos os `readable_fields` do CRUD.
+            Filtros (`?username=`, `?updated_after=`...) e `?ordering=-created_at` seguem o declarado no CRUD.
+            """
+            # 🔥 Sempre projeta nos `readable_fields`: o modelo inteiro exporia colunas como `password`
+            selected = self.model_crud.parse_fields(fields) or self.model_crud.readable_fields
+            filters = self.model_crud.parse_filters(request.query_params)
+            if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+                return StreamingResponse(
+                    self.model_crud.stream_ndjson(settings.STREAM_CHUNK_SIZE, selected, filters),
+                    media_type="application/x-ndjson",
+                )
+
+            items, next_cursor = await self.model_crud.aget_page(
+                limit, cursor, selected, filters, self.model_crud.parse_ordering(ordering)
+            )
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return items
 
         @self.router.get("/{item_id}")
-        def get_one(item_id: str):
-            return self.model_crud.get(item_id)
+        async def get_one(item_id: str, request: Request, response: Response, fields: Optional[str] = None):
+            """
+            Responde com `ETag`/`Last-Modified`. Com `If-None-Match`/`If-Modified-Since`, consulta só o
+            `updated_at` e retorna 304 sem corpo se o cliente já tem a versão atual.
+            """
+            selected = self.model_crud.parse_fields(fields) or self.model_crud.readable_fields
+            if not self.model_crud.versioned:
+                return await self.model_crud.aget_values(item_id, selected)
+
+            if is_conditional(request.headers):
+                updated_at = await self.model_crud.aget_version(item_id)
+                if is_not_modified(request.headers, updated_at):
+                    return Response(status_code=304, headers=validator_headers(updated_at))
+
+            item = await self.model_crud.aget_values(item_id, list(dict.fromkeys([*selected, "updated_at"])))
+            updated_at = item["updated_at"] if "updated_at" in selected else item.pop("updated_at")
+            response.headers.update(validator_headers(updated_at))
+            return item
 
         @self.router.patch("/{item_id}")
-        def update_one(item_id: str, update_data: dict):
-            return self.model_crud.update(item_id, update_data)
+        async def update_one(
+            item_id: str, update_data: dict, response: Response, if_match: Optional[str] = Header(None)
+        ):
+            item = await self.model_crud.aupdate(item_id, update_data, if_match=if_match)
+            if self.model_crud.versioned:
+                response.headers.update(validator_headers(item.updated_at))
+            return self.model_crud.readable_values(item)
 
         @self.router.delete("/{item_id}")
-        def delete_one(item_id: str):
-            return self.model_crud.delete(item_id)
+        async def delete_one(item_id: str):
+            return await self.model_crud.adelete(item_id)
@@ -1,10 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
-from api.auth import check_permission, verify_api_key, generate_permissions, verify_token
+from typing import List, Literal, Optional
+from django.conf import settings
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile
+from pydantic import BaseModel, Field
+from api.auth import authenticate_api_key, authenticate_token, check_permission, verify_api_key, generate_permissions
+from api.principal import Principal
+from core.conditional import validator_headers
 from core.routers.base import RouterBase
-from asgiref.sync import sync_to_async
-from django.core.exceptions import ObjectDoesNotExist
-from simple_history.utils import update_change_reason
-from core.models import CustomUser  # 🔥 Importar o modelo do usuário
+from core.db_executor import db_sync_to_async
+
+
+class BulkUpdateRequest(BaseModel):
+    """Mesmas alterações (`changes`) aplicadas a todos os `ids`"""
+    ids: List[str] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    changes: dict
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+
+class BulkCreateRequest(BaseModel):
+    items: List[dict] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+
+def import_format(file: UploadFile, fmt: Optional[str]) -> str:
+    """Formato da importação: `?format=` ou a extensão do arquivo (.csv, .jsonl/.ndjson)"""
+    fmt = fmt or (file.filename or "").rsplit(".", 1)[-1].lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="Formato não suportado: use CSV ou JSONL")
+    return fmt
+
 
 def create_routers(model_crud, model_name: str):
     """
@@ -23,88 +50,127 @@ def create_routers(model_crud, model_name: str):
     oauth_router.get("/", dependencies=[Depends(check_permission(permissions["view"]))])(router.routes[0].endpoint)
     oauth_router.get("/{item_id}", dependencies=[Depends(check_permission(permissions["view"]))])(router.routes[1].endpoint)
 
+    @oauth_router.post("/", status_code=201, dependencies=[Depends(check_permission(permissions["add"]))])
+    async def create_object_oauth(data: dict, principal: Principal = Depends(authenticate_token)):
+        """Cria um objeto e salva no histórico o usuário autenticado via OAuth2"""
+        return await db_sync_to_async(model_crud.create)(data, principal.user, f"Criado por {principal.username}")
+
+    @oauth_router.post("/bulk", dependencies=[Depends(check_permission(permissions["add"]))])
+    async def bulk_create_oauth(data: BulkCreateRequest, principal: Principal = Depends(authenticate_token)):
+        """Cria vários objetos; erros de validação são reportados por item (posição a partir de 1)"""
+        return await db_sync_to_async(model_crud.bulk_create)(data.items, principal.user, f"Criado em lote por {principal.username}")
+
+    @oauth_router.post("/import", dependencies=[Depends(check_permission(permissions["add"]))])
+    async def import_objects_oauth(
+        file: UploadFile = File(...),
+        format: Optional[Literal["csv", "jsonl"]] = None,
+        principal: Principal = Depends(authenticate_token),
+    ):
+        """Importa um arquivo CSV (com cabeçalho) ou JSONL; erros são reportados por linha"""
+        fmt = import_format(file, format)
+        return await db_sync_to_async(model_crud.import_file)(
+            file.file, fmt, principal.user, f"Importado por {principal.username}"
+        )
+
+    # 🔥 Rotas em lote registradas antes de `/{item_id}` para não serem capturadas por ela
+    @oauth_router.patch("/bulk", dependencies=[Depends(check_permission(permissions["change"]))])
+    async def bulk_update_oauth(data: BulkUpdateRequest, principal: Principal = Depends(authenticate_token)):
+        """Atualiza vários objetos em uma transação, com histórico em lote atribuído ao usuário OAuth2"""
+        total = await db_sync_to_async(model_crud.bulk_update)(
+            data.ids, data.changes, principal.user, f"Modificado em lote por {principal.username}"
+        )
+        return {"message": "Registros atualizados!", "total": total, "modificado_por": principal.username}
+
+    @oauth_router.post("/bulk-delete", dependencies=[Depends(check_permission(permissions["delete"]))])
+    async def bulk_delete_oauth(data: BulkDeleteRequest, principal: Principal = Depends(authenticate_token)):
+        """Soft delete de vários objetos em uma transação, com histórico em lote"""
+        total = await db_sync_to_async(model_crud.bulk_delete)(
+            data.ids, principal.user, f"Removido em lote por {principal.username}"
+        )
+        return {"message": "Registros excluídos!", "total": total, "excluido_por": principal.username}
+
     @oauth_router.patch("/{item_id}")
-    async def update_object_oauth(item_id: str, data: dict, user=Depends(verify_token)):
+    async def update_object_oauth(
+        item_id: str,
+        data: dict,
+        response: Response,
+        if_match: Optional[str] = Header(None),
+        principal: Principal = Depends(authenticate_token),
+    ):
         """
         Atualiza um objeto e salva no histórico o usuário autenticado via OAuth2.
+        Com `If-Match`, responde 412 se o registro mudou desde a leitura que gerou o ETag.
         """
-        try:
-            obj = await sync_to_async(model_crud.get)(item_id)
-
-            # 🔄 Atualiza os campos do objeto
-            for key, value in data.items():
-                setattr(obj, key, value)
-
-            def save_with_history():
-                # 🔥 Buscar o usuário correto no banco de dados
-                history_user = CustomUser.objects.filter(username=user["username"]).first()
-
-                if not history_user:
-                    raise ValueError(f"Usuário {user['username']} não encontrado!")
-
-                obj._history_user = history_user  # ✅ Passar a instância correta
-                obj.save()  # 🔥 Salvar primeiro para garantir que o histórico existe
-                update_change_reason(obj, f"Modificado por {user['username']}")  
-
-            await sync_to_async(save_with_history)()
-            
-            return {"message": "Registro atualizado!", "modificado_por": user["username"]}
-        
-        except ObjectDoesNotExist:
-            raise HTTPException(status_code=404, detail="Objeto não encontrado")
+        # 🔥 Usuário já resolvido na autenticação, sem nova query
+        obj = await model_crud.aupdate(item_id, data, principal.user, f"Modificado por {principal.username}", if_match)
+        if model_crud.versioned:
+            response.headers.update(validator_headers(obj.updated_at))
+        return {"message": "Registro atualizado!", "modificado_por": principal.username}
 
     @oauth_router.delete("/{item_id}", dependencies=[Depends(check_permission(permissions["delete"]))])
-    async def delete_object_oauth(item_id: str, user=Depends(verify_token)):
+    async def delete_object_oauth(item_id: str, principal: Principal = Depends(authenticate_token)):
         """
         Exclui um objeto e salva no histórico o usuário autenticado via OAuth2.
         """
-        try:
-            obj = await sync_to_async(model_crud.get)(item_id)
-
-            def delete_with_history():
-                history_user = CustomUser.objects.filter(username=user["username"]).first()
-
-                if not history_user:
-                    raise ValueError(f"Usuário {user['username']} não encontrado!")
-
-                obj._history_user = history_user
-                obj.save()  # 🔥 Garante que o histórico existe antes de deletar
-                update_change_reason(obj, f"Removido por {user['username']}")
-                obj.delete()
-
-            await sync_to_async(delete_with_history)()
-            
-            return {"message": "Registro excluído!", "excluido_por": user["username"]}
-        
-        except ObjectDoesNotExist:
-            raise HTTPException(status_code=404, detail="Objeto não encontrado")
+        await model_crud.adelete(item_id, principal.user, f"Removido por {principal.username}")
+        return {"message": "Registro excluído!", "excluido_por": principal.username}
 
     # 🔑 Criando roteador API Key (acesso total)
     apikey_router = APIRouter(prefix=f"/k/{model_name}s", tags=[f"{model_name.capitalize()}s (API Key)"], dependencies=[Depends(verify_api_key)])
 
+    @apikey_router.post("/", status_code=201)
+    async def create_object_apikey(data: dict, principal: Principal = Depends(authenticate_api_key)):
+        return await db_sync_to_async(model_crud.create)(data, None, f"Criado via API Key {principal.api_key.name}")
+
+    @apikey_router.post("/bulk")
+    async def bulk_create_apikey(data: BulkCreateRequest, principal: Principal = Depends(authenticate_api_key)):
+        return await db_sync_to_async(model_crud.bulk_create)(
+            data.items, None, f"Criado em lote via API Key {principal.api_key.name}"
+        )
+
+    @apikey_router.post("/import")
+    async def import_objects_apikey(
+        file: UploadFile = File(...),
+        format: Optional[Literal["csv", "jsonl"]] = None,
+        principal: Principal = Depends(authenticate_api_key),
+    ):
+        fmt = import_format(file, format)
+        return await db_sync_to_async(model_crud.import_file)(
+            file.file, fmt, None, f"Importado via API Key {principal.api_key.name}"
+        )
+
+    @apikey_router.patch("/bulk")
+    async def bulk_update_apikey(data: BulkUpdateRequest, principal: Principal = Depends(authenticate_api_key)):
+        """Atualiza vários objetos em uma transação, registrando no histórico a API Key usada"""
+        total = await db_sync_to_async(model_crud.bulk_update)(
+            data.ids, data.changes, None, f"Modificado em lote via API Key {principal.api_key.name}"
+        )
+        return {"message": "Registros atualizados!", "total": total, "modificado_por": principal.display_name}
+
+    @apikey_router.post("/bulk-delete")
+    async def bulk_delete_apikey(data: BulkDeleteRequest, principal: Principal = Depends(authenticate_api_key)):
+        total = await db_sync_to_async(model_crud.bulk_delete)(
+            data.ids, None, f"Removido em lote via API Key {principal.api_key.name}"
+        )
+        return {"message": "Registros excluídos!", "total": total, "excluido_por": principal.display_name}
+
     @apikey_router.patch("/{item_id}")
-    async def update_object_apikey(item_id: str, data: dict, api_key=Depends(verify_api_key)):
+    async def update_object_apikey(
+        item_id: str,
+        data: dict,
+        response: Response,
+        if_match: Optional[str] = Header(None),
+        principal: Principal = Depends(authenticate_api_key),
+    ):
         """
         Atualiza um objeto e salva no histórico o nome da API Key usada.
+        Com `If-Match`, responde 412 se o registro mudou desde a leitura que gerou o ETag.
         """
-        try:
-            obj = await sync_to_async(model_crud.get)(item_id)
-
-            # 🔄 Atualiza os campos do objeto
-            for key, value in data.items():
-                setattr(obj, key, value)
-
-            def save_with_history():
-                obj._history_user = None  # 🔥 API Key não tem usuário associado
-                obj.save()  # 🔥 Salvar primeiro para garantir que o histórico existe
-                update_change_reason(obj, f"Modificado via API Key {api_key.name}")
-
-            await sync_to_async(save_with_history)()
-
-            return {"message": "Registro atualizado!", "modificado_por": f"API Key: {api_key.name}"}
-
-        except ObjectDoesNotExist:
-            raise HTTPException(status_code=404, detail="Objeto não encontrado")
+        # 🔥 API Key não tem usuário associado
+        obj = await model_crud.aupdate(item_id, data, None, f"Modificado via API Key {principal.api_key.name}", if_match)
+        if model_crud.versioned:
+            response.headers.update(validator_headers(obj.updated_at))
+        return {"message": "Registro atualizado!", "modificado_por": principal.display_name}
 
     apikey_router.include_router(router)
 
@@ -94,6 +94,90 @@ OAUTH2_CLIENT_ID = env("OAUTH2_CLIENT_ID")
 OAUTH2_CLIENT_SECRET = env("OAUTH2_CLIENT_SECRET")
 RATE_LIMIT = env("RATE_LIMIT", default="100000")
 
+# 🔥 Rate limit compartilhado entre os workers (requisições por janela, contador em memória compartilhada)
+RATE_LIMIT_WINDOW = env.int("RATE_LIMIT_WINDOW", default=60)
+RATE_LIMIT_STORAGE_PATH = env("RATE_LIMIT_STORAGE_PATH", default=None)  # padrão: /dev/shm/nsgates-ratelimit
+RATE_LIMIT_SLOTS = env.int("RATE_LIMIT_SLOTS", default=65536)
+# 🔥 Planos de rate limit: `anonymous` (por IP), `user` (por usuário OAuth2), `apikey` (padrão das API Keys)
+# e quaisquer outros referenciados em `APIKey.rate_limit_tier`. Ex: {"partner": "5000/minute"}
+RATE_LIMIT_TIERS = {
+    "anonymous": RATE_LIMIT,
+    "user": RATE_LIMIT,
+    "apikey": RATE_LIMIT,
+    **env.json("RATE_LIMIT_TIERS", default={}),
+}
+
+# 🔥 Como validar tokens OAuth2: "http" (introspecção via Django) ou "db" (direto na tabela AccessToken)
+TOKEN_VALIDATION_BACKEND = env("TOKEN_VALIDATION_BACKEND", default="http")
+
+# 🔥 Formato do access token emitido por /auth/token/: "opaque" (padrão do oauth2_provider) ou "jwt" (validado localmente)
+ACCESS_TOKEN_FORMAT = env("ACCESS_TOKEN_FORMAT", default="opaque")
+JWT_ALGORITHM = env("JWT_ALGORITHM", default="HS256")
+JWT_KEYS_FILE = env("JWT_KEYS_FILE", default=None)  # {"active_kid": "...", "keys": {"kid": "segredo"}}
+JWT_KEYS_RELOAD_INTERVAL = env.int("JWT_KEYS_RELOAD_INTERVAL", default=60)
+JWT_DENYLIST_REFRESH_INTERVAL = env.int("JWT_DENYLIST_REFRESH_INTERVAL", default=15)
+
+# 🔥 Cache da validação de tokens OAuth2 (TTL em segundos, limitado pelo `exp` do token).
+# É também o atraso máximo para uma revogação chegar a workers de outras máquinas
+TOKEN_CACHE_TTL = env.int("TOKEN_CACHE_TTL", default=60)
+TOKEN_CACHE_MAX_SIZE = env.int("TOKEN_CACHE_MAX_SIZE", default=10000)
+
+# 🔥 Chave do HMAC que protege os segredos das API Keys (trocar invalida todas as chaves)
+APIKEY_HASH_KEY = env.str("APIKEY_HASH_KEY", default=SECRET_KEY)
+
+# 🔥 Cache negativo de credenciais inválidas (TTL curto) e alerta por origem dentro desse intervalo
+NEGATIVE_CACHE_TTL = env.int("NEGATIVE_CACHE_TTL", default=30)
+NEGATIVE_CACHE_MAX_SIZE = env.int("NEGATIVE_CACHE_MAX_SIZE", default=10000)
+NEGATIVE_CACHE_SOURCE_ALERT = env.int("NEGATIVE_CACHE_SOURCE_ALERT", default=100)
+
+# 🔥 Índice em memória das API Keys ativas. Mudanças valem na hora para os workers da máquina;
+# o intervalo é o atraso máximo para mudanças feitas em outras máquinas
+APIKEY_INDEX_REFRESH_INTERVAL = env.int("APIKEY_INDEX_REFRESH_INTERVAL", default=30)
+
+# 🔥 Cache das permissões por usuário (invalidado por signals)
+PERMISSION_CACHE_TTL = env.int("PERMISSION_CACHE_TTL", default=300)
+PERMISSION_CACHE_MAX_SIZE = env.int("PERMISSION_CACHE_MAX_SIZE", default=10000)
+
+# 🔥 Gerações compartilhadas entre os workers (/dev/shm): invalidação dos caches vale na hora para todos
+CACHE_GENERATIONS_PATH = env("CACHE_GENERATIONS_PATH", default=None)  # padrão: /dev/shm/nsgates-generations
+CACHE_GENERATIONS_SLOTS = env.int("CACHE_GENERATIONS_SLOTS", default=65536)
+
+# 🔥 Cliente HTTP compartilhado (introspecção e proxy de /auth/token/)
+HTTP_CLIENT_MAX_CONNECTIONS = env.int("HTTP_CLIENT_MAX_CONNECTIONS", default=100)
+HTTP_CLIENT_MAX_KEEPALIVE = env.int("HTTP_CLIENT_MAX_KEEPALIVE", default=20)
+HTTP_CLIENT_KEEPALIVE_EXPIRY = env.float("HTTP_CLIENT_KEEPALIVE_EXPIRY", default=30.0)
+HTTP_CLIENT_TIMEOUT = env.float("HTTP_CLIENT_TIMEOUT", default=10.0)
+HTTP_CLIENT_POOL_TIMEOUT = env.float("HTTP_CLIENT_POOL_TIMEOUT", default=5.0)
+
+# 🔥 Log de acesso da API (gravado em lote por uma thread em segundo plano)
+ACCESS_LOG_DIR = env("ACCESS_LOG_DIR", default="logs/api")
+ACCESS_LOG_QUEUE_SIZE = env.int("ACCESS_LOG_QUEUE_SIZE", default=10000)
+ACCESS_LOG_BATCH_SIZE = env.int("ACCESS_LOG_BATCH_SIZE", default=500)
+ACCESS_LOG_FLUSH_INTERVAL = env.float("ACCESS_LOG_FLUSH_INTERVAL", default=1.0)
+ACCESS_LOG_SAMPLE_RATE = env.float("ACCESS_LOG_SAMPLE_RATE", default=1.0)  # fração das respostas < 400 registradas
+ACCESS_LOG_RETENTION_DAYS = env.int("ACCESS_LOG_RETENTION_DAYS", default=7)  # arquivos diários mais antigos são apagados
+
+# 🔥 Clientes (CIDR) que recebem o cabeçalho `Server-Timing` com o tempo de cada fase da requisição
+SERVER_TIMING_TRUSTED_NETWORKS = env.list("SERVER_TIMING_TRUSTED_NETWORKS", default=["127.0.0.1/32", "::1/128"])
+
+# 🔥 Paginação por cursor das listagens (`GET /`): tamanho padrão e máximo de página (`?limit=`)
+PAGINATION_DEFAULT_LIMIT = env.int("PAGINATION_DEFAULT_LIMIT", default=100)
+PAGINATION_MAX_LIMIT = env.int("PAGINATION_MAX_LIMIT", default=1000)
+STREAM_CHUNK_SIZE = env.int("STREAM_CHUNK_SIZE", default=2000)  # linhas por leitura do cursor no `?stream=1`
+BULK_MAX_ITEMS = env.int("BULK_MAX_ITEMS", default=10000)  # ids por requisição nas rotas em lote
+
+# 🔥 Threads dedicadas ao ORM em cada worker, cada uma com a sua conexão persistente ao PostgreSQL
+# (reaproveitada por até `DB_EXECUTOR_CONN_MAX_AGE` segundos). Orçamento de conexões da máquina:
+# `API_WORKERS` × `DB_EXECUTOR_WORKERS` (+ as conexões curtas do admin) deve ficar abaixo do
+# `max_connections` do PostgreSQL (padrão 100): ex. 9 workers × 10 threads = 90
+DB_EXECUTOR_WORKERS = env.int("DB_EXECUTOR_WORKERS", default=10)
+DB_EXECUTOR_CONN_MAX_AGE = env.int("DB_EXECUTOR_CONN_MAX_AGE", default=60)
+
+# 🔥 Cache das leituras dos CRUDs (opt-in por modelo: {"core.customuser": 30} = TTL em segundos)
+CRUD_CACHE_TTL = env.json("CRUD_CACHE_TTL", default={})
+CRUD_CACHE_MAX_SIZE = env.int("CRUD_CACHE_MAX_SIZE", default=10000)
+CRUD_CACHE_MAX_BYTES = env.int("CRUD_CACHE_MAX_BYTES", default=64 * 1024 * 1024)
+
 DJANGO_OAUTH2_TOKEN_URL = os.getenv("DJANGO_OAUTH2_TOKEN_URL", "http://127.0.0.1:8000/auth/oauth2/token/")
 
 WATCHMAN_AUTH_DECORATOR = "django.contrib.admin.views.decorators.staff_member_required"
@@ -149,6 +233,10 @@ DATABASES = {
         "PASSWORD": env("DATABASE_PASSWORD"),
         "HOST": env("DATABASE_HOST"),
         "PORT": env.int("DATABASE_PORT", default=5432),
+        # 🔥 Fora do pool do banco (admin, management commands) cada requisição abre e fecha a sua conexão;
+        # a persistência das threads do pool é definida em `DB_EXECUTOR_CONN_MAX_AGE`
+        "CONN_MAX_AGE": env.int("DATABASE_CONN_MAX_AGE", default=0),
+        "CONN_HEALTH_CHECKS": True,
         "TEST" : {
             "NAME" : "test_nsgates_db"
         }
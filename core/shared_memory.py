@@ -0,0 +1,74 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # 🔥 Windows: sem memória compartilhada nem locks entre processos, a tabela vale só para o worker
+    fcntl = None
+
+HEADER = struct.Struct("<8sQ")  # 🔥 magic + quantidade de slots
+
+
+def default_storage_path(name: str) -> str:
+    """Arquivo em `/dev/shm` (memória, não disco) ou, sem ele, no diretório temporário"""
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(shm_dir, name)
+
+
+class SharedTable:
+    """
+    Tabela de slots de tamanho fixo em um arquivo mapeado em memória, compartilhada pelos workers da máquina.
+    O cabeçalho identifica o layout (`magic` + quantidade de slots); se mudar, a tabela é recriada zerada.
+    Sem `path` (ou sem `fcntl`), vira um `bytearray` local ao worker.
+    Os dados ficam em `buf`, a partir de `HEADER.size`; `locked` trava uma faixa de bytes entre processos.
+    """
+
+    def __init__(self, path: str, magic: bytes, slots: int, slot_size: int):
+        self.magic = magic
+        self.slots = slots
+        self.size = HEADER.size + slots * slot_size
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()  # 🔥 Locks do fcntl são por processo, não por thread
+
+        if path and fcntl:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._init_shared()
+            self.buf = mmap.mmap(self._fd, self.size)
+        else:
+            self.buf = bytearray(self.size)
+
+    def _init_shared(self):
+        """Cria (ou recria, se o layout mudou) a tabela; o primeiro worker a chegar inicializa"""
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, HEADER.size, 0)
+        try:
+            header = os.pread(self._fd, HEADER.size, 0)
+            if os.fstat(self._fd).st_size != self.size or header != HEADER.pack(self.magic, self.slots):
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, HEADER.pack(self.magic, self.slots), 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, HEADER.size, 0)
+
+    @contextmanager
+    def locked(self, offset: int, length: int):
+        """Trava `length` bytes a partir de `offset` para as outras threads e os outros workers"""
+        with self._lock:
+            if self._fd is None:
+                yield
+                return
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+
+    def close(self):
+        if self._fd is not None:
+            self.buf.close()
+            os.close(self._fd)
+            self._fd = None
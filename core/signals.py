@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from oauth2_provider.models import AccessToken
+
+from core.apikey_index import apikey_index
+from core.cache import token_cache
+from core.crud.cache import crud_cache
+from core.jwt_tokens import denylist
+from core.models import APIKey, CustomUser, RevokedToken
+from core.models.base import rows_changed, soft_deleted
+from core.permissions import permission_resolver
+
+
+@receiver(post_save, sender=AccessToken)
+@receiver(post_delete, sender=AccessToken)
+def evict_access_token(sender, instance, **kwargs):
+    """
+    Remove o token do cache de introspecção quando ele é alterado ou revogado, em todos os workers da máquina.
+    `AccessToken.revoke()` apaga o registro, então `post_delete` cobre a revogação.
+    Repete no commit: outro worker pode ter validado o token antes de a remoção ser commitada.
+    """
+    if instance.token_checksum:
+        checksum = instance.token_checksum
+        token_cache.delete(checksum)
+        transaction.on_commit(lambda: token_cache.delete(checksum))
+
+
+@receiver(post_delete, sender=AccessToken)
+def deny_revoked_jwt(sender, instance, **kwargs):
+    """Registra na denylist o JWT emitido para um AccessToken revogado antes de expirar"""
+    if settings.ACCESS_TOKEN_FORMAT != "jwt" or not instance.token_checksum or instance.is_expired():
+        return
+
+    RevokedToken.objects.get_or_create(jti=instance.token_checksum, defaults={"expires_at": instance.expires})
+    denylist.add(instance.token_checksum, instance.expires.timestamp())  # 🔥 Vale na hora neste worker
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    """Usuário alterado (ativo, removido, soft delete...) perde as permissões em cache"""
+    permission_resolver.invalidate(instance.username)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_all_permissions(sender, **kwargs):
+    """Mudanças em grupos ou permissões podem afetar qualquer usuário"""
+    permission_resolver.invalidate()
+
+
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permissions_m2m(sender, instance, action, reverse, **kwargs):
+    """
+    Permissões diretas, grupos do usuário ou permissões de um grupo foram alterados.
+    Se a alteração partiu do usuário, invalida só ele; caso contrário, o cache inteiro.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if isinstance(instance, CustomUser):
+        permission_resolver.invalidate(instance.username)
+    else:
+        permission_resolver.invalidate()
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+@receiver(soft_deleted, sender=APIKey)
+def invalidate_apikey_index(sender, instance, **kwargs):
+    """Chave criada, revogada, removida ou com nova expiração: vale na hora para todos os workers da máquina"""
+    apikey_index.invalidate()
+
+
+@receiver(rows_changed, sender=CustomUser)
+def invalidate_bulk_user_permissions(sender, ids, **kwargs):
+    """Alterações em lote não informam os usernames, então limpa o cache de permissões inteiro"""
+    permission_resolver.invalidate()
+
+
+@receiver(rows_changed, sender=APIKey)
+def invalidate_bulk_apikey_index(sender, ids, **kwargs):
+    apikey_index.invalidate()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(soft_deleted)
+def invalidate_crud_cache(sender, instance, **kwargs):
+    """
+    Registro alterado, removido, com soft delete ou restaurado (`restore()` usa `save`) sai do cache de leituras.
+    Invalida na hora e de novo no commit: uma leitura feita antes do commit ainda veria a versão antiga.
+    """
+    if not crud_cache.is_tracked(sender):
+        return
+    crud_cache.invalidate(sender, instance.pk)
+    transaction.on_commit(lambda: crud_cache.invalidate(sender, instance.pk))
+
+
+@receiver(rows_changed)
+def invalidate_crud_cache_rows(sender, ids, **kwargs):
+    """Operações em lote (já enviadas após o commit)"""
+    crud_cache.invalidate(sender, *ids)
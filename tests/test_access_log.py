@@ -0,0 +1,80 @@
+import time
+import orjson
+from api.access_log import AccessLogWriter, ACCESS_LOG_DROPPED
+
+
+def test_access_log_writes_batches(tmp_path):
+    """Registros enfileirados devem ser gravados como JSON Lines ao encerrar o writer"""
+    writer = AccessLogWriter(str(tmp_path), batch_size=2, flush_interval=0.05)
+    writer.start()
+    for i in range(5):
+        writer.log({"path": f"/item/{i}", "status_code": 200})
+    writer.stop()
+
+    (log_file,) = tmp_path.iterdir()
+    records = [orjson.loads(line) for line in log_file.read_bytes().splitlines()]
+    assert [record["path"] for record in records] == [f"/item/{i}" for i in range(5)]
+
+
+def test_access_log_drops_when_queue_is_full(tmp_path):
+    """Fila cheia descarta o registro sem bloquear e incrementa o contador"""
+    writer = AccessLogWriter(str(tmp_path), queue_size=1)  # 🔥 Sem `start()`, a fila não esvazia
+    before = ACCESS_LOG_DROPPED._value.get()
+    writer.log({"status_code": 200})
+    writer.log({"status_code": 200})
+    assert ACCESS_LOG_DROPPED._value.get() == before + 1
+
+
+def test_access_log_sampling_keeps_errors(tmp_path):
+    """Com amostragem zero, só respostas de erro entram na fila"""
+    writer = AccessLogWriter(str(tmp_path), sample_rate=0)
+    writer.log({"status_code": 200})
+    writer.log({"status_code": 500})
+    assert writer._queue.qsize() == 1
+
+
+def test_access_log_prunes_files_older_than_retention(tmp_path):
+    """Ao abrir o arquivo do dia, os arquivos além de `retention_days` são apagados"""
+    from datetime import date, timedelta
+
+    old = tmp_path / f"access-{(date.today() - timedelta(days=8)).isoformat()}.log"
+    recent = tmp_path / f"access-{(date.today() - timedelta(days=2)).isoformat()}.log"
+    other = tmp_path / "api.log"
+    for path in (old, recent, other):
+        path.write_bytes(b"{}\n")
+
+    writer = AccessLogWriter(str(tmp_path), retention_days=7)
+    writer._write([{"status_code": 200}])
+    writer._close()
+
+    assert not old.exists() and recent.exists() and other.exists()
+    assert (tmp_path / f"access-{date.today().isoformat()}.log").exists()
+
+
+def test_access_log_survives_write_errors(tmp_path):
+    """Um erro de gravação perde só o lote; a thread continua gravando os próximos"""
+    from unittest.mock import patch
+    from api.access_log import ACCESS_LOG_WRITE_ERRORS
+
+    writer = AccessLogWriter(str(tmp_path), batch_size=1, flush_interval=0.05)
+    original_write = writer._write
+    calls = []
+
+    def flaky_write(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise OSError("disco cheio")
+        original_write(batch)
+
+    before = ACCESS_LOG_WRITE_ERRORS._value.get()
+    with patch.object(writer, "_write", side_effect=flaky_write):
+        writer.start()
+        writer.log({"path": "/perdido", "status_code": 200})
+        while not calls:
+            time.sleep(0.01)
+        writer.log({"path": "/gravado", "status_code": 200})
+        writer.stop()
+
+    (log_file,) = tmp_path.iterdir()
+    assert [orjson.loads(line)["path"] for line in log_file.read_bytes().splitlines()] == ["/gravado"]
+    assert ACCESS_LOG_WRITE_ERRORS._value.get() == before + 1
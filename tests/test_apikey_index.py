@@ -0,0 +1,94 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from starlette.requests import Request
+
+from api import auth
+from core.apikey_index import APIKeyIndex
+from core.generations import SharedGenerations
+from core.models.apikey import APIKey
+
+
+def make_request():
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "client": ("10.0.0.1", 1234)})
+
+
+@pytest.mark.django_db
+def test_index_keeps_copy_without_raw_key():
+    """O índice guarda uma cópia da chave salva, sem a chave completa exibida na criação"""
+    key = APIKey(name="indice-copia")
+    key.save()
+    index = APIKeyIndex()
+
+    index.update(key)
+
+    cached = index.lookup(key.raw_key)
+    assert cached is not None and cached.pk == key.pk
+    assert cached is not key and not hasattr(cached, "raw_key")
+    assert index.lookup(f"{key.raw_key}x") is None  # 🔥 Mesmo prefixo, segredo errado
+
+
+@pytest.mark.django_db
+def test_unknown_prefix_falls_back_to_one_query(django_assert_num_queries):
+    """Chave criada depois do carregamento (ex: em outro worker) é buscada pelo prefixo e entra no índice"""
+    index = APIKeyIndex(shared=SharedGenerations())  # 🔥 Gerações próprias: simula um worker de outra máquina
+    index.load()
+    key = APIKey(name="indice-fallback")
+    key.save()
+
+    assert index.lookup(key.raw_key) is None and not index.contains(key.raw_key)
+    with django_assert_num_queries(1):
+        assert index.fetch(key.raw_key).pk == key.pk
+    with django_assert_num_queries(0):
+        assert index.lookup(key.raw_key).pk == key.pk
+
+
+@pytest.mark.django_db
+def test_fetch_skips_revoked_key():
+    """A busca pelo prefixo respeita o mesmo critério de chave ativa do carregamento"""
+    key = APIKey(name="indice-revogada", revoked=True)
+    key.save()
+    index = APIKeyIndex()
+
+    assert index.fetch(key.raw_key) is None
+    assert not index.contains(key.raw_key)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_verify_api_key_accepts_key_missing_from_index():
+    """A dependência aceita uma chave ainda fora do índice em memória, sem recarregar o índice inteiro"""
+    index = APIKeyIndex(shared=SharedGenerations())
+    index.load()
+    key = APIKey(name="indice-verify")
+    key.save()
+
+    with patch.object(auth, "apikey_index", index), patch.object(index, "load") as load:
+        request = make_request()
+        assert asyncio.run(auth.verify_api_key(request, key.raw_key)).pk == key.pk
+
+    load.assert_not_called()
+    assert request.state.principal.display_name == "API Key: indice-verify"
+
+
+@pytest.mark.django_db
+def test_revocation_reaches_other_workers(tmp_path):
+    """Revogar em um worker tira a chave de uso na hora nos demais, que recarregam o índice na próxima validação"""
+    path = str(tmp_path / "generations")
+    worker_a = APIKeyIndex(shared=SharedGenerations(path, slots=64))
+    worker_b = APIKeyIndex(shared=SharedGenerations(path, slots=64))
+    key = APIKey(name="indice-revogacao")
+    key.save()
+    worker_a.load()
+    worker_b.load()
+    assert worker_b.lookup(key.raw_key).pk == key.pk
+
+    key.revoked = True
+    key.save()
+    worker_a.invalidate()
+
+    assert worker_b.lookup(key.raw_key) is None
+    assert worker_b.is_stale()
+    worker_b.load()
+    assert not worker_b.is_stale()
+    assert worker_b.lookup(key.raw_key) is None
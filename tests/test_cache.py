@@ -0,0 +1,108 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.utils.timezone import now
+from oauth2_provider.models import AccessToken
+from core.cache import SharedTTLCache, TTLCache, hash_credential, token_cache
+from core.generations import SharedGenerations
+from core.models import CustomUser
+
+
+def test_cache_get_set():
+    """Testa leitura e escrita básicas no cache"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_cache_expires_entries():
+    """Testa se a entrada expira respeitando o TTL informado"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction():
+    """Testa se o item menos usado recentemente é removido ao atingir o limite"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # 🔥 `a` passa a ser o mais recente
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_cache_ignores_non_positive_ttl():
+    """Token já expirado não deve ser armazenado"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=-5)
+    assert cache.get("a") is None
+
+
+def test_hash_credential_matches_token_checksum():
+    """O hash usado como chave deve ser o mesmo `token_checksum` do oauth2_provider"""
+    import hashlib
+    assert hash_credential("abc") == hashlib.sha256(b"abc").hexdigest()
+
+
+def test_cache_evicts_by_total_size():
+    """Com `max_bytes`, entradas antigas saem até a soma dos tamanhos caber no limite"""
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=100)
+    cache.set("a", 1, size=60)
+    cache.set("b", 2, size=30)
+    cache.set("c", 3, size=30)
+
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == (2, 3)
+    assert cache.bytes == 60
+
+    cache.set("grande", 4, size=101)  # 🔥 Maior que o limite: não é armazenada
+    assert cache.get("grande") is None
+    assert cache.bytes == 60
+
+
+def test_shared_cache_invalidation_reaches_other_workers(tmp_path):
+    """`delete`/`clear` em um worker descarta a entrada nos demais (mesmo arquivo de gerações)"""
+    path = str(tmp_path / "generations")
+    worker_a = SharedTTLCache("teste", shared=SharedGenerations(path, slots=64))
+    worker_b = SharedTTLCache("teste", shared=SharedGenerations(path, slots=64))
+    worker_a.set("joao", {"view"})
+    worker_b.set("joao", {"view"})
+    worker_b.set("maria", {"change"})
+
+    worker_a.delete("joao")
+    assert worker_b.get("joao") is None
+    assert worker_b.get("maria") == {"change"}
+
+    worker_a.clear()
+    assert worker_b.get("maria") is None
+
+
+def test_shared_cache_skips_value_read_before_invalidation(tmp_path):
+    """Valor buscado antes de uma invalidação não fica válido no cache"""
+    cache = SharedTTLCache("teste", shared=SharedGenerations(str(tmp_path / "generations"), slots=64))
+    generation = cache.generation("joao")
+    cache.delete("joao")  # 🔥 Alteração concorrente enquanto o valor antigo era buscado
+    cache.set("joao", {"antigo"}, generation=generation)
+    assert cache.get("joao") is None
+
+
+@pytest.mark.django_db
+def test_revoked_token_leaves_token_cache():
+    """Apagar o AccessToken (revogação) remove a validação em cache, também para os outros workers"""
+    user = CustomUser.objects.create(username="revogado", email="revogado@example.com")
+    access_token = AccessToken.objects.create(user=user, token="token-revogado", expires=now() + timedelta(hours=1))
+    token_cache.set(access_token.token_checksum, {"active": True, "username": "revogado"})
+    generation = token_cache.generation(access_token.token_checksum)
+
+    access_token.delete()
+
+    assert token_cache.get(access_token.token_checksum) is None
+    assert token_cache.generation(access_token.token_checksum) != generation
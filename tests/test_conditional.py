@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+
+from django.utils.http import http_date
+
+from core.conditional import etag_matches, is_not_modified, make_etag, validator_headers
+
+UPDATED_AT = datetime(2025, 3, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+
+
+def test_etag_changes_with_every_update():
+    """O ETag é fraco e muda até com microssegundos de diferença"""
+    etag = make_etag(UPDATED_AT)
+    assert etag.startswith('W/"')
+    assert etag != make_etag(UPDATED_AT + timedelta(microseconds=1))
+    assert validator_headers(UPDATED_AT)["Last-Modified"] == "Sat, 01 Mar 2025 12:00:00 GMT"
+
+
+def test_etag_matches_uses_weak_comparison():
+    etag = make_etag(UPDATED_AT)
+    assert etag_matches(etag, UPDATED_AT)
+    assert etag_matches(etag.removeprefix("W/"), UPDATED_AT)
+    assert etag_matches(f'W/"outro", {etag}', UPDATED_AT)
+    assert etag_matches("*", UPDATED_AT)
+    assert not etag_matches('W/"outro"', UPDATED_AT)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    """Com `If-None-Match`, o `If-Modified-Since` é ignorado (RFC 9110)"""
+    future = http_date((UPDATED_AT + timedelta(days=1)).timestamp())
+    assert not is_not_modified({"if-none-match": 'W/"outro"', "if-modified-since": future}, UPDATED_AT)
+    assert is_not_modified({"if-modified-since": future}, UPDATED_AT)
+    assert is_not_modified({"if-modified-since": http_date(UPDATED_AT.timestamp())}, UPDATED_AT)
+    assert not is_not_modified({"if-modified-since": http_date(UPDATED_AT.timestamp() - 1)}, UPDATED_AT)
+    assert not is_not_modified({"if-modified-since": "data inválida"}, UPDATED_AT)
@@ -0,0 +1,334 @@
+import io
+import orjson
+import pytest
+from asgiref.sync import async_to_sync
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from api.timing import RequestTimings, current_timings
+from core.conditional import make_etag
+from core.crud.base import AsyncCRUDBase, CRUDBase, encode_cursor
+from core.crud.cache import CRUDCache, crud_cache
+from core.crud.importer import _copy_value
+from core.crud.user import user_crud
+from core.generations import SharedGenerations
+from core.models.base import rows_changed
+from core.models.user import CustomUser
+from core.routers.base import RouterBase
+
+
+@pytest.mark.django_db
+def test_get_page_walks_all_rows_with_cursor():
+    """A paginação por cursor deve percorrer todos os registros, sem repetir nem pular"""
+    for i in range(5):
+        CustomUser.objects.create_user(username=f"page{i}", email=f"page{i}@email.com", password="Test@123456")
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = user_crud.get_page(limit=2, cursor=cursor)
+        seen.extend(user.username for user in items)
+        if cursor is None:
+            break
+
+    assert seen == [f"page{i}" for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_get_page_breaks_ties_by_id():
+    """Registros com o mesmo `created_at` são desempatados pelo `id`"""
+    for i in range(3):
+        CustomUser.objects.create_user(username=f"tie{i}", email=f"tie{i}@email.com", password="Test@123456")
+    CustomUser.objects.update(created_at=CustomUser.objects.first().created_at)
+
+    first, cursor = user_crud.get_page(limit=2)
+    second, _ = user_crud.get_page(limit=2, cursor=cursor)
+
+    expected = sorted(CustomUser.objects.values_list("id", flat=True))
+    assert [user.id for user in first + second] == expected
+
+
+@pytest.mark.parametrize("cursor", [
+    "não-é-um-cursor",
+    encode_cursor("created_at", "2025-01-01T00:00:00+00:00", "zzz"),  # 🔥 id que não é UUID
+    encode_cursor("created_at", [1, 2], "00000000-0000-0000-0000-000000000000"),
+])
+def test_get_page_rejects_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as exc:
+        user_crud.get_page(limit=2, cursor=cursor)
+    assert (exc.value.status_code, exc.value.detail) == (400, "Cursor inválido")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_crud_pages_and_updates_with_history():
+    """O CRUD async pagina igual ao síncrono e grava o histórico com usuário e motivo"""
+    for i in range(3):
+        CustomUser.objects.create_user(username=f"async{i}", email=f"async{i}@email.com", password="Test@123456")
+
+    async def walk():
+        seen, cursor = [], None
+        while True:
+            items, cursor = await user_crud.aget_page(limit=2, cursor=cursor, fields=["username"])
+            seen.extend(item["username"] for item in items)
+            if cursor is None:
+                return seen
+
+    assert async_to_sync(walk)() == ["async0", "async1", "async2"]
+
+    user = CustomUser.objects.get(username="async1")
+    async_to_sync(user_crud.aupdate)(str(user.id), {"first_name": "Async"}, change_reason="teste async")
+    record = user.history.first()
+    assert (record.first_name, record.history_change_reason) == ("Async", "teste async")
+
+    with pytest.raises(HTTPException) as exc:
+        async_to_sync(user_crud.aget)("00000000-0000-0000-0000-000000000000")
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_update_with_stale_if_match_is_rejected():
+    """`If-Match` com a versão lida antes de outra alteração responde 412 e não salva"""
+    user = CustomUser.objects.create_user(username="ifmatch", email="ifmatch@email.com", password="Test@123456")
+    etag = make_etag(user_crud.get_version(str(user.id)))
+
+    async_to_sync(user_crud.aupdate)(str(user.id), {"first_name": "Primeira"}, if_match=etag)
+    with pytest.raises(HTTPException) as exc:
+        async_to_sync(user_crud.aupdate)(str(user.id), {"first_name": "Segunda"}, if_match=etag)
+
+    assert exc.value.status_code == 412
+    assert CustomUser.objects.get(id=user.id).first_name == "Primeira"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_reads_skip_the_database_until_invalidated():
+    """Com `cache_ttl`, leituras repetidas não consultam o banco, e `save`/soft delete invalidam o registro"""
+    user = CustomUser.objects.create_user(username="cached", email="cached@email.com", password="Test@123456")
+    cached_crud = AsyncCRUDBase(CustomUser, readable_fields=user_crud.readable_fields, cache_ttl=60)
+    try:
+        row = async_to_sync(cached_crud.aget_row)(str(user.id))
+
+        async def read_again():
+            token = current_timings.set(timings)  # 🔥 O `db_timer` conta as queries das threads do pool
+            try:
+                assert await cached_crud.aget_values(str(user.id).upper(), ["username"]) == {"username": "cached"}
+                await cached_crud.aget_page(limit=10)
+                return await cached_crud.aget_page(limit=10)
+            finally:
+                current_timings.reset(token)
+
+        timings = RequestTimings()
+        page, _ = async_to_sync(read_again)()
+        assert timings.db_queries == 1  # 🔥 Só a primeira página foi ao banco
+        assert "password" not in row and page[0]["username"] == "cached"
+
+        user.first_name = "Novo"
+        user.save()
+        assert async_to_sync(cached_crud.aget_row)(str(user.id))["first_name"] == "Novo"
+
+        user.delete()
+        with pytest.raises(HTTPException):
+            async_to_sync(cached_crud.aget_row)(str(user.id))
+    finally:
+        crud_cache.ttls.pop(CustomUser._meta.label_lower)
+        crud_cache.clear()
+
+
+def test_crud_cache_invalidation_reaches_other_workers(tmp_path):
+    """Alteração tratada por um worker descarta o registro e as páginas em cache nos demais"""
+    path = str(tmp_path / "generations")
+    worker_a = CRUDCache(maxsize=10, max_bytes=10_000, shared=SharedGenerations(path, slots=64))
+    worker_b = CRUDCache(maxsize=10, max_bytes=10_000, shared=SharedGenerations(path, slots=64))
+    for worker in (worker_a, worker_b):
+        worker.register(CustomUser, 60)
+    worker_b.set(CustomUser, "object", "1", {"username": "antigo"}, worker_b.generation(CustomUser, "1"))
+    worker_b.set(CustomUser, "object", "2", {"username": "outro"}, worker_b.generation(CustomUser, "2"))
+    worker_b.set(CustomUser, "page", "p", [{"username": "antigo"}], worker_b.generation(CustomUser))
+
+    worker_a.invalidate(CustomUser, "1")
+
+    assert worker_b.get(CustomUser, "object", "1") is None
+    assert worker_b.get(CustomUser, "page", "p") is None
+    assert worker_b.get(CustomUser, "object", "2") == {"username": "outro"}
+
+
+@pytest.mark.django_db
+def test_stream_ndjson_exports_readable_fields_only():
+    """O streaming exporta uma linha por registro, só com os campos legíveis (sem `password`)"""
+    for i in range(3):
+        CustomUser.objects.create_user(username=f"stream{i}", email=f"stream{i}@email.com", password="Test@123456")
+
+    async def collect():
+        return b"".join([chunk async for chunk in user_crud.stream_ndjson(chunk_size=2, buffer_size=1)])
+
+    rows = [orjson.loads(line) for line in async_to_sync(collect)().splitlines()]
+
+    assert [row["username"] for row in rows] == ["stream0", "stream1", "stream2"]
+    assert all("password" not in row for row in rows)
+
+
+@pytest.mark.django_db
+def test_get_page_with_fields_returns_only_selected_columns():
+    """Com `fields`, a página vem como dicts só com os campos pedidos, e o cursor continua funcionando"""
+    for i in range(3):
+        CustomUser.objects.create_user(username=f"sparse{i}", email=f"sparse{i}@email.com", password="Test@123456")
+    fields = user_crud.parse_fields("id,username")
+
+    first, cursor = user_crud.get_page(limit=2, fields=fields)
+    second, _ = user_crud.get_page(limit=2, cursor=cursor, fields=fields)
+
+    assert first[0].keys() == {"id", "username"}
+    assert [row["username"] for row in first + second] == ["sparse0", "sparse1", "sparse2"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_routes_without_fields_never_return_password():
+    """Sem `?fields=`, listagem, leitura e PATCH respondem só com os `readable_fields` (nunca o hash da senha)"""
+    user = CustomUser.objects.create_user(username="rota", email="rota@email.com", password="Test@123456")
+    app = FastAPI()
+    app.include_router(RouterBase(user_crud, "/users").router)
+    client = TestClient(app)
+
+    responses = [
+        client.get("/users/").json()[0],
+        client.get(f"/users/{user.id}").json(),
+        client.patch(f"/users/{user.id}", json={"first_name": "Rota"}).json(),
+    ]
+
+    assert all(row.keys() == set(user_crud.readable_fields) for row in responses)
+    assert responses[2]["first_name"] == "Rota"
+
+
+def test_parse_fields_rejects_fields_outside_allowlist():
+    with pytest.raises(HTTPException) as exc:
+        user_crud.parse_fields("username,password")
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.django_db
+def test_get_page_filters_and_descending_ordering():
+    """Filtros declarados e `ordering=-created_at` devem funcionar junto com o cursor"""
+    for i in range(4):
+        CustomUser.objects.create_user(
+            username=f"order{i}", email=f"order{i}@email.com", password="Test@123456", is_active=i != 0
+        )
+    filters = user_crud.parse_filters({"is_active": "true", "ignorado": "x"})
+    ordering = user_crud.parse_ordering("-created_at")
+
+    first, cursor = user_crud.get_page(limit=2, filters=filters, ordering=ordering)
+    second, _ = user_crud.get_page(limit=2, cursor=cursor, filters=filters, ordering=ordering)
+
+    assert [user.username for user in first + second] == ["order3", "order2", "order1"]
+    with pytest.raises(HTTPException):
+        user_crud.get_page(limit=2, cursor=cursor, filters=filters)  # 🔥 Cursor de outra ordenação
+
+
+def test_parse_ordering_rejects_undeclared_field():
+    with pytest.raises(HTTPException) as exc:
+        user_crud.parse_ordering("-password")
+    assert exc.value.status_code == 400
+
+
+def test_warns_about_unindexed_filters(caplog):
+    """Filtros sem índice geram aviso na inicialização"""
+    CRUDBase(CustomUser, filter_fields={"first_name": "first_name__icontains"})
+    assert "CustomUser.first_name" in caplog.text
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_update_and_delete_write_history_in_batch():
+    """Alteração e soft delete em lote gravam um histórico por registro e avisam via `rows_changed`"""
+    users = [
+        CustomUser.objects.create_user(username=f"bulk{i}", email=f"bulk{i}@email.com", password="Test@123456")
+        for i in range(3)
+    ]
+    ids = [str(user.id) for user in users]
+    received = []
+
+    def on_rows_changed(sender, ids, **kwargs):
+        received.append(set(ids))
+
+    rows_changed.connect(on_rows_changed, sender=CustomUser)
+    try:
+        assert user_crud.bulk_update(ids, {"first_name": "Lote"}, change_reason="teste") == 3
+        assert user_crud.bulk_delete(ids[:2]) == 2
+    finally:
+        rows_changed.disconnect(on_rows_changed, sender=CustomUser)
+
+    assert list(CustomUser.objects.values_list("first_name", flat=True)) == ["Lote"]
+    assert CustomUser.history.filter(history_change_reason="teste").count() == 3
+    assert received == [{user.id for user in users}, {users[0].id, users[1].id}]
+
+
+def test_bulk_update_rejects_non_writable_fields():
+    with pytest.raises(HTTPException) as exc:
+        user_crud.bulk_update(["00000000-0000-0000-0000-000000000000"], {"password": "x"})
+    assert exc.value.status_code == 400
+
+
+def test_bulk_update_rejects_unique_fields():
+    """O mesmo `username` em vários registros sempre conflitaria: 400 antes de ir ao banco"""
+    with pytest.raises(HTTPException) as exc:
+        user_crud.bulk_update(["00000000-0000-0000-0000-000000000000"], {"username": "repetido"})
+    assert exc.value.status_code == 400 and "username" in exc.value.detail
+
+
+@pytest.mark.django_db(transaction=True)
+def test_update_with_taken_unique_value_is_a_conflict():
+    """PATCH com `username` de outro registro responde 409 em vez de estourar o IntegrityError"""
+    CustomUser.objects.create_user(username="ocupado", email="ocupado@email.com", password="Test@123456")
+    user = CustomUser.objects.create_user(username="livre", email="livre@email.com", password="Test@123456")
+
+    with pytest.raises(HTTPException) as exc:
+        async_to_sync(user_crud.aupdate)(str(user.id), {"username": "ocupado"})
+
+    assert exc.value.status_code == 409
+    user.refresh_from_db()
+    assert user.username == "livre"
+
+
+@pytest.mark.django_db
+def test_bulk_create_reports_errors_per_item():
+    """Itens inválidos ou duplicados são reportados pela posição; os demais são criados com histórico"""
+    result = user_crud.bulk_create(
+        [{"username": "novo1"}, {"username": "novo1"}, {"username": "nome inválido!"}, {"username": "novo2"}],
+        change_reason="carga",
+    )
+
+    assert result["criados"] == 2
+    assert [error["linha"] for error in result["erros"]] == [2, 3]
+    assert CustomUser.history.filter(history_type="+", history_change_reason="carga").count() == 2
+    assert not CustomUser.objects.get(username="novo1").has_usable_password()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_user_writable_fields_reject_privileged_fields():
+    """Criação e PATCH recusam campos fora do `writable_fields` explícito (ex: `is_superuser`)"""
+    with pytest.raises(HTTPException) as exc:
+        user_crud.create({"username": "intruso", "is_superuser": True})
+    assert exc.value.status_code == 400 and "is_superuser" in exc.value.detail
+
+    user = CustomUser.objects.create_user(username="comum", email="comum@email.com", password="Test@123456")
+    with pytest.raises(HTTPException) as exc:
+        async_to_sync(user_crud.aupdate)(str(user.id), {"first_name": "Comum", "is_staff": True})
+    assert exc.value.status_code == 400
+
+    user.refresh_from_db()
+    assert (user.first_name, user.is_staff) == ("", False)
+    assert not CustomUser.objects.filter(username="intruso").exists()
+
+
+@pytest.mark.django_db
+def test_import_file_csv_and_jsonl():
+    """Importação lê o arquivo linha a linha e reporta erros pelo número da linha"""
+    csv_file = io.BytesIO(b"username,email,first_name\ncsv1,csv1@email.com,\ncsv2,email-invalido,\n")
+    result = user_crud.import_file(csv_file, "csv")
+    assert (result["total"], result["criados"]) == (2, 1)
+    assert result["erros"][0]["linha"] == 3
+
+    jsonl_file = io.BytesIO(b'{"username": "jsonl1"}\nnao-e-json\n{"username": "csv1"}\n')
+    result = user_crud.import_file(jsonl_file, "jsonl")
+    assert (result["total"], result["criados"], result["total_erros"]) == (3, 1, 2)
+
+
+def test_copy_value_escapes_text_format():
+    assert _copy_value(None) == "\\N"
+    assert _copy_value(True) == "t"
+    assert _copy_value("a\tb\\c\n") == "a\\tb\\\\c\\n"
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from api.timing import RequestTimings, current_timings
+from core.db_executor import DB_EXECUTOR_QUEUE_DEPTH, db_sync_to_async
+
+# 🔥 Cada chamada passa pelo `close_old_connections` nas conexões das threads do pool
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_calls_run_in_parallel_threads():
+    """Duas chamadas lentas não ficam uma atrás da outra (com `thread_sensitive=True` a barreira estouraria)"""
+    barrier = threading.Barrier(2, timeout=2)
+
+    def slow_query():
+        barrier.wait()
+        return threading.current_thread().name
+
+    async def run():
+        return await asyncio.gather(db_sync_to_async(slow_query)(), db_sync_to_async(slow_query)())
+
+    names = asyncio.run(run())
+
+    assert len(set(names)) == 2
+    assert all(name.startswith("db") for name in names)
+    assert DB_EXECUTOR_QUEUE_DEPTH.collect()[0].samples[0].value == 0
+
+
+def test_request_context_reaches_pool_thread():
+    """O `current_timings` da requisição chega à thread do pool (o `db_timer` soma as queries nele)"""
+    timings = RequestTimings()
+
+    async def run():
+        current_timings.set(timings)
+        await db_sync_to_async(lambda: current_timings.get().add("db", 0.001))()
+
+    asyncio.run(run())
+
+    assert timings.phases == {"db": 0.001}
+
+
+def test_connections_cleaned_once_per_call():
+    """`close_old_connections` roda uma vez por chamada, ao final (inclusive quando a função levanta)"""
+    def fail():
+        raise ValueError
+
+    with patch("core.db_executor.close_old_connections") as close_old_connections:
+        asyncio.run(db_sync_to_async(lambda: None)())
+        with pytest.raises(ValueError):
+            asyncio.run(db_sync_to_async(fail)())
+
+    assert close_old_connections.call_count == 2
+
+
+def test_only_pool_threads_keep_persistent_connections(settings):
+    """As threads do pool usam `DB_EXECUTOR_CONN_MAX_AGE`; as demais, o `CONN_MAX_AGE` das settings"""
+    from django.db import connection
+
+    pool_max_age = asyncio.run(db_sync_to_async(lambda: connection.settings_dict["CONN_MAX_AGE"])())
+
+    assert pool_max_age == settings.DB_EXECUTOR_CONN_MAX_AGE
+    assert connection.settings_dict["CONN_MAX_AGE"] == settings.DATABASES["default"]["CONN_MAX_AGE"]
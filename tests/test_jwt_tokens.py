@@ -0,0 +1,73 @@
+import json
+import time
+import uuid
+import pytest
+from core.cache import hash_credential
+from core.jwt_tokens import KeySet, InvalidToken, decode_access_token, denylist, encode_access_token, is_jwt
+
+USER_ID = uuid.uuid4()  # 🔥 Usuário fictício, sem banco
+
+
+def test_jwt_roundtrip():
+    """Testa se o JWT emitido é validado com as permissões embutidas"""
+    token = encode_access_token("opaque-1", USER_ID, "jwtuser", ["view_customuser"], "read", expires_in=60)
+
+    assert is_jwt(token)
+    token_data = decode_access_token(token)
+    assert token_data["active"] is True
+    assert token_data["username"] == "jwtuser"
+    assert token_data["permissions"] == frozenset({"view_customuser"})
+
+
+def test_jwt_rejects_tampered_token():
+    """Token com assinatura alterada deve ser rejeitado"""
+    token = encode_access_token("opaque-2", USER_ID, "jwtuser", [], "read", expires_in=60)
+    with pytest.raises(InvalidToken):
+        decode_access_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+
+
+def test_jwt_rejects_expired_token():
+    """Token expirado deve ser rejeitado"""
+    token = encode_access_token("opaque-3", USER_ID, "jwtuser", [], "read", expires_in=-1)
+    with pytest.raises(InvalidToken):
+        decode_access_token(token)
+
+
+def test_jwt_rejects_denylisted_token():
+    """Token cujo AccessToken foi revogado deve ser rejeitado sem consultar o banco"""
+    token = encode_access_token("opaque-4", USER_ID, "jwtuser", [], "read", expires_in=60)
+    denylist.add(hash_credential("opaque-4"), time.time() + 60)
+    with pytest.raises(InvalidToken):
+        decode_access_token(token)
+
+
+def test_keyset_rotation(tmp_path):
+    """Testa se a troca da chave ativa no arquivo é aplicada mantendo a antiga para verificação"""
+    keys_file = tmp_path / "jwt_keys.json"
+    keys_file.write_text(json.dumps({"active_kid": "k1", "keys": {"k1": "segredo-1"}}))
+    keyset = KeySet(str(keys_file), reload_interval=0)
+    assert keyset.signing_key() == ("k1", "segredo-1")
+
+    keys_file.write_text(json.dumps({"active_kid": "k2", "keys": {"k1": "segredo-1", "k2": "segredo-2"}}))
+    import os
+    os.utime(keys_file, (time.time() + 5, time.time() + 5))  # 🔥 Garante mtime diferente
+
+    assert keyset.signing_key() == ("k2", "segredo-2")
+    assert keyset.verification_key("k1") == "segredo-1"
+
+
+def test_keyset_keeps_last_good_keys_when_file_breaks(tmp_path):
+    """Arquivo removido ou inválido não derruba a autenticação: as últimas chaves continuam valendo"""
+    keys_file = tmp_path / "jwt_keys.json"
+    keys_file.write_text(json.dumps({"active_kid": "k1", "keys": {"k1": "segredo-1"}}))
+    keyset = KeySet(str(keys_file), reload_interval=0)
+    assert keyset.signing_key() == ("k1", "segredo-1")
+
+    keys_file.write_text("{ json pela metade")
+    assert keyset.verification_key("k1") == "segredo-1"
+
+    keys_file.unlink()
+    assert keyset.signing_key() == ("k1", "segredo-1")
+
+    missing = KeySet(str(tmp_path / "nao-existe.json"), reload_interval=0)
+    assert missing.verification_key("k1") is None  # 🔥 Vira 401 (InvalidToken), não 500
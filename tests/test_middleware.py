@@ -0,0 +1,73 @@
+import asyncio
+import uuid
+from unittest.mock import patch
+
+from api.middleware import GatewayMiddleware
+from api.ratelimit import RateLimit
+
+
+async def hello_app(scope, receive, send):
+    """App ASGI mínimo: 200 com corpo fixo"""
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def call(client_host: str, rate_limit: RateLimit, identity: str) -> list:
+    """Roda uma requisição pelo middleware e devolve as mensagens ASGI enviadas"""
+    scope = {
+        "type": "http", "method": "GET", "path": "/hello", "query_string": b"",
+        "headers": [], "client": (client_host, 1234),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    with patch("api.middleware.resolve_rate_limit", return_value=(rate_limit, identity)):
+        asyncio.run(GatewayMiddleware(hello_app)(scope, receive, send))
+    return messages
+
+
+def response_headers(messages: list) -> dict:
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    return {name.decode(): value.decode() for name, value in start["headers"]}
+
+
+def test_middleware_adds_rate_limit_headers():
+    """Toda resposta repassada pelo app ganha os cabeçalhos `RateLimit-*` do plano"""
+    identity = f"ip:{uuid.uuid4()}"  # 🔥 Contador compartilhado: identidade única por execução
+
+    messages = call("203.0.113.10", RateLimit("teste", 5, 60), identity)
+
+    headers = response_headers(messages)
+    assert messages[0]["status"] == 200 and messages[-1]["body"] == b"ok"
+    assert (headers["ratelimit-limit"], headers["ratelimit-remaining"]) == ("5", "4")
+    assert 0 < int(headers["ratelimit-reset"]) <= 60
+
+
+def test_middleware_blocks_with_429_and_retry_after():
+    """Estourada a cota, responde 429 com `Retry-After` sem chamar o app"""
+    rate_limit, identity = RateLimit("teste", 1, 60), f"ip:{uuid.uuid4()}"
+
+    call("203.0.113.10", rate_limit, identity)
+    messages = call("203.0.113.10", rate_limit, identity)
+
+    headers = response_headers(messages)
+    assert messages[0]["status"] == 429
+    assert headers["retry-after"] == headers["ratelimit-reset"]
+    assert headers["ratelimit-remaining"] == "0"
+    assert b"ok" not in b"".join(message.get("body", b"") for message in messages)
+
+
+def test_server_timing_only_for_trusted_clients():
+    """`Server-Timing` só vai para clientes de `SERVER_TIMING_TRUSTED_NETWORKS`"""
+    rate_limit = RateLimit("teste", 5, 60)
+
+    trusted = response_headers(call("127.0.0.1", rate_limit, f"ip:{uuid.uuid4()}"))
+    untrusted = response_headers(call("203.0.113.10", rate_limit, f"ip:{uuid.uuid4()}"))
+
+    assert "total;dur=" in trusted["server-timing"]
+    assert "server-timing" not in untrusted
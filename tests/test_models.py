@@ -26,10 +26,12 @@ def test_restore_user():
     """Testa a restauração de um usuário deletado"""
     user = CustomUser.objects.create(username="testuser", email="test@example.com")
     user.delete()
+    deleted_version = user.updated_at
     user.restore()
 
     assert user.deleted_at is None  # Deve voltar a ser None
     assert CustomUser.objects.filter(username="testuser").exists() is True  # Deve aparecer novamente
+    assert CustomUser.objects.get(id=user.id).updated_at > deleted_version  # 🔥 Nova versão para o ETag
 
 @pytest.mark.django_db
 def test_history_tracking():
@@ -43,3 +45,18 @@ def test_history_tracking():
     assert history.first().email == "updated@example.com"
     assert history.last().email == "test@example.com"  # Versão inicial
 
+
+@pytest.mark.django_db
+def test_apikey_stores_only_hash():
+    """Testa se a API Key salva apenas prefixo + hash e valida a chave completa"""
+    from core.models import APIKey
+
+    api_key = APIKey.objects.create(name="servico-teste")
+    raw_key = api_key.raw_key
+
+    assert raw_key.startswith(f"nsg_{api_key.prefix}_")
+    assert raw_key not in (api_key.key_hash, api_key.prefix)
+
+    stored = APIKey.objects.get(prefix=api_key.prefix)
+    assert stored.check_key(raw_key) is True
+    assert stored.check_key(raw_key + "x") is False
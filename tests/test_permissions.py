@@ -0,0 +1,49 @@
+import pytest
+from django.contrib.auth.models import Group, Permission
+from core.models import CustomUser
+from core.permissions import permission_resolver
+
+
+@pytest.mark.django_db
+def test_resolver_includes_group_permissions():
+    """Testa se permissões diretas e de grupo vêm juntas em um frozenset"""
+    user = CustomUser.objects.create(username="permuser", email="perm@example.com")
+    group = Group.objects.create(name="editores")
+    group.permissions.add(Permission.objects.get(codename="change_customuser"))
+    user.groups.add(group)
+    user.user_permissions.add(Permission.objects.get(codename="view_customuser"))
+
+    user_id, permissions = permission_resolver.resolve("permuser")
+
+    assert user_id == user.id
+    assert permissions == frozenset({"view_customuser", "change_customuser"})
+
+
+@pytest.mark.django_db
+def test_resolver_cache_invalidated_on_change():
+    """Testa se alterar as permissões do usuário invalida o cache na hora"""
+    user = CustomUser.objects.create(username="permuser2", email="perm2@example.com")
+    assert permission_resolver.resolve("permuser2")[1] == frozenset()
+
+    user.user_permissions.add(Permission.objects.get(codename="delete_customuser"))
+
+    assert permission_resolver.cached("permuser2") is None
+    assert "delete_customuser" in permission_resolver.resolve("permuser2")[1]
+
+
+@pytest.mark.django_db
+def test_resolver_unknown_user():
+    """Usuário inexistente retorna None"""
+    assert permission_resolver.resolve("naoexiste") is None
+
+
+def test_prime_skips_permissions_loaded_before_an_invalidation():
+    """Permissões lidas por uma query que não sabia o username não ficam em cache se houve invalidação no meio"""
+    changes = permission_resolver.cache.changes()  # 🔥 Lido antes da query (ex: `introspect_token_db`)
+    permission_resolver.cache.delete("outro-usuario")  # 🔥 Alteração concorrente em outro worker
+    permission_resolver.prime("primeuser", 1, ["view_customuser"], changes=changes)
+    assert permission_resolver.cached("primeuser") is None
+
+    permission_resolver.prime("primeuser", 1, ["view_customuser"], changes=permission_resolver.cache.changes())
+    assert permission_resolver.cached("primeuser") == (1, frozenset({"view_customuser"}))
+    permission_resolver.cache.delete("primeuser")
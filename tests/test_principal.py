@@ -0,0 +1,15 @@
+import uuid
+from api.principal import Principal
+
+
+def test_principal_from_token_builds_user_stub():
+    """O principal do token deve carregar um usuário leve com o pk já resolvido, sem query"""
+    user_id = uuid.uuid4()
+    principal = Principal.from_token({"username": "ana", "scope": "read"}, str(user_id), frozenset({"view_customuser"}))
+
+    assert principal.user_id == user_id
+    assert principal.user.pk == user_id
+    assert principal.user.username == "ana"
+    assert principal.display_name == "ana"
+    assert principal.has_permission("view_customuser")
+    assert not principal.has_permission("delete_customuser")
@@ -0,0 +1,103 @@
+import multiprocessing
+from api.ratelimit import SlidingWindowCounter
+
+
+def test_ratelimit_blocks_after_limit():
+    """Testa se a cota é respeitada dentro da janela e o restante é informado"""
+    counter = SlidingWindowCounter(slots=64)
+
+    results = [counter.hit("10.0.0.1", 3, 60, now=120.0) for _ in range(4)]
+
+    assert [allowed for allowed, _, _ in results] == [True, True, True, False]
+    assert results[0][1] == 2
+    assert counter.hit("10.0.0.2", 3, 60, now=120.0)[0]  # 🔥 Outra chave tem cota própria
+
+
+def test_ratelimit_sliding_window_weights_previous_window():
+    """Metade da janela seguinte ainda conta metade das requisições anteriores"""
+    counter = SlidingWindowCounter(slots=64)
+    for _ in range(10):
+        counter.hit("ip", 10, 60, now=60.0)
+
+    assert not counter.hit("ip", 10, 60, now=119.0)[0]
+    allowed = [counter.hit("ip", 10, 60, now=150.0)[0] for _ in range(6)]
+    assert allowed == [True] * 5 + [False]
+
+
+def _hit_many(path, count, results):
+    counter = SlidingWindowCounter(path=path, slots=64)
+    results.put(sum(counter.hit("shared", 50, 60, now=30.0)[0] for _ in range(count)))
+
+
+def test_ratelimit_shared_between_processes(tmp_path):
+    """Workers diferentes usando o mesmo arquivo dividem a mesma cota"""
+    path = str(tmp_path / "ratelimit")
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_hit_many, args=(path, 40, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sum(results.get() for _ in workers) == 50
+
+
+def test_ratelimit_parse_tiers():
+    """Planos aceitam `N/periodo` ou só o número (janela padrão)"""
+    from django.conf import settings
+    from api.ratelimit import RateLimit
+
+    assert RateLimit.parse("partner", "5000/minute") == RateLimit("partner", 5000, 60)
+    assert RateLimit.parse("batch", "10/hours").window == 3600
+    assert RateLimit.parse("anonymous", "100").window == settings.RATE_LIMIT_WINDOW
+
+
+def make_request(headers: dict):
+    from starlette.requests import Request
+
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers, "client": ("10.0.0.9", 1234)})
+
+
+def test_resolve_rate_limit_prefers_api_key_then_token_then_ip(settings):
+    """Ordem da identidade: API Key válida (plano da chave), usuário do token em cache, e por fim o IP"""
+    from unittest.mock import patch
+    from api import ratelimit
+    from core.apikey_index import APIKeyIndex
+    from core.cache import hash_credential, token_cache
+    from core.models.apikey import APIKey
+
+    settings.ACCESS_TOKEN_FORMAT = "opaque"
+    key = APIKey(name="limite", rate_limit_tier="apikey")
+    raw_key = key.generate_key()
+    index = APIKeyIndex()
+    index.update(key)
+    token_cache.set(hash_credential("token-limite"), {"username": "ana"})
+    bearer = {"Authorization": "Bearer token-limite"}
+
+    with patch.object(ratelimit, "apikey_index", index):
+        resolve = lambda headers: ratelimit.resolve_rate_limit(make_request(headers))
+        assert resolve({"X-API-Key": raw_key, **bearer}) == (ratelimit.rate_limit_tiers["apikey"], f"key:{key.prefix}")
+        assert resolve({"X-API-Key": f"{raw_key}x", **bearer}) == (ratelimit.rate_limit_tiers["user"], "user:ana")
+        assert resolve({"Authorization": "Bearer nao-validado"}) == (ratelimit.rate_limit_tiers["anonymous"], "ip:10.0.0.9")
+        assert resolve({}) == (ratelimit.rate_limit_tiers["anonymous"], "ip:10.0.0.9")
+
+        key.rate_limit_tier = "inexistente"  # 🔥 Plano desconhecido cai no plano padrão das API Keys
+        index.update(key)
+        assert resolve({"X-API-Key": raw_key})[0] == ratelimit.rate_limit_tiers["apikey"]
+
+    token_cache.delete(hash_credential("token-limite"))
+
+
+def test_resolve_rate_limit_reads_username_from_jwt(settings):
+    """Com `ACCESS_TOKEN_FORMAT=jwt`, o usuário vem do próprio token (sem cache); JWT inválido cai no IP"""
+    import uuid
+    from api import ratelimit
+    from core.jwt_tokens import encode_access_token
+
+    settings.ACCESS_TOKEN_FORMAT = "jwt"
+    token = encode_access_token("opaque-limite", uuid.uuid4(), "bia", [], "read", expires_in=60)
+
+    resolve = lambda token: ratelimit.resolve_rate_limit(make_request({"Authorization": f"Bearer {token}"}))
+    assert resolve(token) == (ratelimit.rate_limit_tiers["user"], "user:bia")
+    assert resolve(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))[1] == "ip:10.0.0.9"
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from api.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces_concurrent_calls():
+    """Chamadas simultâneas com a mesma chave devem executar a busca uma única vez"""
+    flight = SingleFlight("teste")
+    calls = []
+
+    async def lookup(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    results = await asyncio.gather(*[flight.do("mesma-chave", lookup, 21) for _ in range(10)])
+
+    assert results == [42] * 10
+    assert calls == [21]
+    assert len(flight) == 0  # 🔥 Chave liberada após terminar
+
+
+@pytest.mark.asyncio
+async def test_singleflight_shares_exceptions():
+    """Erro da busca (ex: token inválido) deve chegar a todos que esperavam"""
+    flight = SingleFlight("teste")
+
+    async def lookup():
+        await asyncio.sleep(0.01)
+        raise ValueError("inválido")
+
+    results = await asyncio.gather(*[flight.do("x", lookup) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_singleflight_leader_cancellation_does_not_cancel_followers():
+    """Se quem iniciou a busca for cancelado, os demais ainda recebem o resultado"""
+    flight = SingleFlight("teste")
+
+    async def lookup():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    leader = asyncio.ensure_future(flight.do("x", lookup))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("x", lookup))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "ok"
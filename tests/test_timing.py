@@ -0,0 +1,32 @@
+from api.timing import RequestTimings, current_timings, is_trusted, phase
+
+
+def test_phase_accumulates_in_current_request():
+    """Fases repetidas somam e o db informa a quantidade de queries"""
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        with phase("auth"):
+            pass
+        with phase("auth"):
+            pass
+    finally:
+        current_timings.reset(token)
+    timings.add("db", 0.002)
+    timings.db_queries = 2
+
+    assert set(timings.phases) == {"auth", "db"}
+    assert 'db;dur=2.00;desc="2 queries"' in timings.server_timing()
+
+
+def test_phase_without_request_is_noop():
+    """Fora de uma requisição (ex: management commands) nada é medido"""
+    with phase("db"):
+        pass
+    assert current_timings.get() is None
+
+
+def test_server_timing_only_for_trusted_networks():
+    assert is_trusted("127.0.0.1")
+    assert not is_trusted("203.0.113.10")
+    assert not is_trusted("testclient")
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from django.contrib.auth.models import Permission
+from django.utils.timezone import now
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from oauth2_provider.models import AccessToken
+from starlette.requests import Request
+
+from api import auth
+from core.models import CustomUser
+from core.permissions import permission_resolver
+
+
+def test_validate_token_uses_configured_backend(settings):
+    """`TOKEN_VALIDATION_BACKEND` escolhe a função de introspecção e o resultado vai para o cache"""
+    settings.TOKEN_VALIDATION_BACKEND = "db"
+    token_data = {"active": True, "username": "backenduser", "exp": None}
+    backends = {"http": AsyncMock(), "db": AsyncMock(return_value=token_data)}
+
+    with patch.dict(auth.TOKEN_VALIDATION_BACKENDS, backends):
+        assert asyncio.run(auth.validate_token("abc", "chave-backend")) == token_data
+
+    backends["db"].assert_awaited_once_with("abc")
+    backends["http"].assert_not_awaited()
+    assert auth.token_cache.get("chave-backend") == token_data
+    auth.token_cache.delete("chave-backend")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_introspect_token_db_returns_introspection_payload():
+    """O backend `db` valida pelo checksum e já deixa as permissões no cache"""
+    user = CustomUser.objects.create(username="dbtoken", email="dbtoken@example.com")
+    user.user_permissions.add(Permission.objects.get(codename="view_customuser"))
+    AccessToken.objects.create(user=user, token="token-db-valido", expires=now() + timedelta(hours=1), scope="read")
+
+    token_data = asyncio.run(auth.introspect_token_db("token-db-valido"))
+
+    assert token_data["active"] is True and token_data["username"] == "dbtoken"
+    assert token_data["scope"] == "read"
+    assert permission_resolver.cached("dbtoken") == (user.pk, frozenset({"view_customuser"}))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_introspect_token_db_rejects_expired_and_unknown_tokens():
+    user = CustomUser.objects.create(username="dbexpired", email="dbexpired@example.com")
+    AccessToken.objects.create(user=user, token="token-db-expirado", expires=now() - timedelta(seconds=1))
+
+    for token in ("token-db-expirado", "token-inexistente"):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(auth.introspect_token_db(token))
+        assert exc.value.status_code == 401
+
+
+def verify_http_token(settings, token: str, response):
+    """Roda o `verify_token` com o backend `http`, respondendo a introspecção com `response` (ou levantando-a)"""
+    settings.TOKEN_VALIDATION_BACKEND = "http"
+    settings.ACCESS_TOKEN_FORMAT = "opaque"
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [], "client": ("10.0.0.2", 1234)})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    post = AsyncMock(side_effect=response) if isinstance(response, Exception) else AsyncMock(return_value=response)
+
+    with patch.object(auth.http_client, "post", post):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(auth.verify_token(request, credentials))
+    return exc_info.value
+
+
+@pytest.mark.parametrize("response, status_code", [
+    (httpx.ConnectTimeout("timeout"), 503),
+    (httpx.Response(500, text="erro"), 502),
+    (httpx.Response(200, text="<html>"), 502),
+])
+def test_introspection_outage_is_not_a_rejection(settings, response, status_code):
+    """Timeout ou erro do servidor de introspecção vira 503/502 e não vai para o cache negativo"""
+    token = f"token-fora-do-ar-{status_code}-{id(response)}"
+
+    exc = verify_http_token(settings, token, response)
+
+    assert exc.status_code == status_code
+    assert auth.rejected_credentials.get(("token", auth.hash_credential(token))) is None
+    assert auth.token_cache.get(auth.hash_credential(token)) is None
+
+
+def test_inactive_token_is_negative_cached(settings):
+    """Só a resposta definitiva `active: false` recusa o token (401) e entra no cache negativo"""
+    token = "token-inativo"
+    cache_key = auth.hash_credential(token)
+
+    exc = verify_http_token(settings, token, httpx.Response(200, json={"active": False}))
+
+    assert exc.status_code == 401
+    assert auth.rejected_credentials.get(("token", cache_key)) == (401, exc.detail)
+    auth.rejected_credentials.delete(("token", cache_key))